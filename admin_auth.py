@@ -0,0 +1,31 @@
+import os
+
+import streamlit as st
+
+
+# --- 管理者パスワード（secrets.toml の [admin] password または PERF_ADMIN_PASSWORD） ---
+def get_admin_password() -> str | None:
+    try:
+        if "admin" in st.secrets:
+            return st.secrets["admin"].get("password")
+    except Exception:
+        pass
+    return os.environ.get("PERF_ADMIN_PASSWORD")
+
+
+def require_admin():
+    """管理者としてログインしていなければ、パスワード入力を出してページを止める"""
+    password = get_admin_password()
+
+    if not password:
+        st.info("管理者パスワードが設定されていません（secrets.toml の [admin] password または PERF_ADMIN_PASSWORD）。")
+        st.stop()
+
+    if not st.session_state.get("perf_admin"):
+        pwd = st.text_input("🔐 管理者パスワード", type="password")
+        if pwd == password:
+            st.session_state["perf_admin"] = True
+            st.rerun()
+        elif pwd:
+            st.error("パスワードが違います。")
+        st.stop()
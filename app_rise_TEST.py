@@ -1,7 +1,15 @@
 import streamlit as st
 import pandas as pd
-import requests
-import plotly.graph_objects as go
+import time
+from candle_adjust import adjust_highlow
+from candle_data import chart_key, iter_candles
+from candle_thumb import thumbnail_html
+from cache_warmer import start_cache_warmer
+from local_screener import local_surges
+from perf import page_end, page_start, record, section
+from screening_data import BATCH_PERIOD, HIGHLOW_LABELS, current_all_highlow, current_highlow, load_batch, time_bucket
+from etf_list import etf_codes, etf_list_date
+from screening_index import frame_key, get_screening_index
 
 # ✅ 許可するパスワードを複数指定（リスト形式）
 VALID_PASSWORDS = ["kuma", "5678"] # ユーザー提供のパスワードを使用
@@ -64,75 +72,186 @@ st.markdown("""
 <p style='margin: 6px 0;'>⚠️ **「本日の抽出結果」は約30分ごとに更新されます。**</p>
 <p style='margin: 6px 0;'>⚠️ 平日8:30〜9:00の間に短時間のメンテナンスが入ることがあります。</p>
 <p style='margin: 6px 0;'>⚠️ 表示されるチャートは昨日までの日足チャートです。</p>
-<p style='margin: 6px 0;'>⚠️株式分割や株式併合などがあった場合、過去の株価は分割・併合を考慮しておりません。</p>
+<p style='margin: 6px 0;'>⚠️チャート・高値・安値は登録済みの株式分割・併合を反映しています。</p>
 </div>
 """, unsafe_allow_html=True)
 
 
 # -------------------------------------------------------------
-# キャッシュのTTLを30分 (1800秒) に設定
+# 抽出結果は30分 (1800秒) ごとの区切りでキャッシュ（バックグラウンドで先読み）
 # -------------------------------------------------------------
-@st.cache_data(ttl=1800)  
+start_cache_warmer()
+
+page_timer = page_start("rule1")
+
+ALL_DAYS = "all"
+
 def load_data(source):
+    """抽出結果（高値・安値は登録済みの分割・併合で補正する）"""
     try:
-        url_map = {
-            "today": "https://app.kumagai-stock.com/api/highlow/today",
-            "yesterday": "https://app.kumagai-stock.com/api/highlow/yesterday",
-            "target2day": "https://app.kumagai-stock.com/api/highlow/target2day",
-            "target3day": "https://app.kumagai-stock.com/api/highlow/target3day",
-            "target4day": "https://app.kumagai-stock.com/api/highlow/target4day",
-            "target5day": "https://app.kumagai-stock.com/api/highlow/target5day"
-        }
-        url = url_map.get(source, url_map["today"])
-        res = requests.get(url, timeout=10)
-        res.raise_for_status()
-        
-        # データの型を明示的に変換（high, lowなどが数値であることを保証）
-        df = pd.DataFrame(res.json())
-        if not df.empty:
-            for col in ["high", "low"]:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            df.dropna(subset=["high", "low"], inplace=True)
-            
-        return df
+        if source == ALL_DAYS:
+            return adjust_highlow(current_all_highlow())
+        return adjust_highlow(current_highlow(source))
     except Exception as e:
         st.error(f"データの読み込み中にエラーが発生しました: {e}")
         return pd.DataFrame()
 
+def load_local_data(offset, lookback, min_mult, max_mult):
+    try:
+        return local_surges(offset, lookback, min_mult, max_mult)
+    except Exception as e:
+        st.error(f"ローカル計算中にエラーが発生しました: {e}")
+        return pd.DataFrame()
+
 # -------------------------------------------------------------
 # ラジオボタンの配置
 # -------------------------------------------------------------
-option = st.radio("『高値』付けた日を選んでください", ["本日", "昨日", "2日前", "3日前", "4日前", "5日前"], horizontal=True)
+mode = st.radio("抽出方法", ["サーバー", "ローカル計算"], horizontal=True, key="rule1_mode")
+
+if mode == "ローカル計算":
+    # 手元の日足ストアから、期間・倍率・高値日を変えてその場で計算する
+    with st.expander("抽出条件", expanded=True):
+        offset = st.number_input("『高値』を付けた日（N営業日前、0＝最新の足）", 0, 120, 0)
+        lookback = st.slider("期間（営業日）", 5, 30, 10)
+        min_mult, max_mult = st.slider("倍率", 1.0, 5.0, (1.3, 2.0), step=0.05)
+    st.caption("※ 日足ストアに保存されている銘柄が対象です。最新の足は前営業日までの日足です。")
+    data_source = f"local:{offset}:{lookback}:{min_mult}:{max_mult}"
+else:
+    # 「すべて」は本日〜5日前をまとめて、同じ銘柄は1行（一番新しい高値日）にする
+    day_options = {label: source for source, label in HIGHLOW_LABELS.items()}
+    day_options["すべて"] = ALL_DAYS
+    option = st.radio("『高値』付けた日を選んでください", list(day_options), horizontal=True)
+
+    data_source = day_options[option]
 
-data_source = {
-    "本日": "today",
-    "昨日": "yesterday",
-    "2日前": "target2day",
-    "3日前": "target3day",
-    "4日前": "target4day",
-    "5日前": "target5day"
-}[option]
+# ここで最新データがロードされる（サーバー側で更新されていれば取り直す）
+if mode == "ローカル計算":
+    df = load_local_data(offset, lookback, min_mult, max_mult)
+else:
+    df = load_data(data_source)
+
+# 🔽 初期状態で除外する銘柄コード（画面の「絞り込み・検索」で変更できる）
+DEFAULT_EXCLUDE_CODES = "9501, 9432, 7203"
 
 # -------------------------------------------------------------
-# アプリ起動時（初回実行時）にキャッシュを強制クリアするロジック
+# 並び順・表示件数・ページ（st.session_state に保持）
 # -------------------------------------------------------------
-if 'initial_data_loaded' not in st.session_state:
-    st.session_state['initial_data_loaded'] = True
-    load_data.clear()
-    
-# ここで最新データがロードされる
-df = load_data(data_source)
+SORT_OPTIONS = {
+    "標準": (None, False),
+    "倍率の高い順": ("倍率", False),
+    "倍率の低い順": ("倍率", True),
+    "上昇幅の大きい順": ("上昇幅", False),
+    "高値からの距離が近い順": ("高値からの距離", False),
+    "高値からの距離が遠い順": ("高値からの距離", True),
+    "銘柄コード順": ("銘柄コード", True),
+    "高値日の新しい順": ("高値日", False),
+    "出現回数の多い順": ("出現回数", False),
+}
+PAGE_SIZES = [10, 20, 50]
+
+if "rule1_page" not in st.session_state:
+    st.session_state["rule1_page"] = 0
+
+def build_index(df, with_prices=False):
+    """
+    キャッシュ済みの抽出結果から、絞り込み・並べ替え用の索引を取得（中身が同じなら使い回す）。
+    現在値（遅い batch）は「高値からの距離」で並べるときだけ取りにいく。
+    """
+    if not with_prices:
+        return get_screening_index((frame_key(df), None), df)
+    bucket = time_bucket(BATCH_PERIOD)
+    try:
+        prices, _ = load_batch(bucket)
+    except Exception:
+        prices = None
+    return get_screening_index((frame_key(df), bucket), df, prices)
+
+def move_page(step, total_pages):
+    st.session_state["rule1_page"] = min(max(st.session_state["rule1_page"] + step, 0), total_pages - 1)
 
-# 🔽 除外したい銘柄コードを指定
-exclude_codes = {"9501", "9432", "7203"}  # 必要に応じて追加
+def render_pager(total_pages, total_rows, key):
+    """前へ／次へ ボタンとページ位置の表示"""
+    page = st.session_state["rule1_page"]
+    cols = st.columns([1, 2, 1])
+    with cols[0]:
+        st.button("◀ 前へ", key=f"prev_{key}", disabled=page <= 0,
+                  on_click=move_page, args=(-1, total_pages))
+    with cols[1]:
+        st.markdown(
+            f"<div style='text-align:center; font-size:13px;'>{page + 1} / {total_pages} ページ（全 {total_rows} 銘柄）</div>",
+            unsafe_allow_html=True,
+        )
+    with cols[2]:
+        st.button("次へ ▶", key=f"next_{key}", disabled=page >= total_pages - 1,
+                  on_click=move_page, args=(1, total_pages))
 
-# 🔽 除外処理（コードが含まれていない行のみ残す）
-df = df[~df["code"].isin(exclude_codes)]
+def render_chart(slot, code, df_chart):
+    """カードのチャート枠に SVG サムネイル（またはエラー表示）を入れる"""
+    if isinstance(df_chart, Exception):
+        slot.caption(f"（エラー: {df_chart}）")
+    elif df_chart.empty:
+        slot.caption("（チャートデータなし）")
+    else:
+        # サーバー側で作った SVG サムネイルをそのまま埋め込む（Plotly 不要）
+        slot.markdown(thumbnail_html(code, chart_key(code, df_chart), df_chart), unsafe_allow_html=True)
+
+chart_slots = {}
+
+if not df.empty:
+    index = build_index(df)
+
+    # 🔽 絞り込み・検索（キャッシュ済みの索引に対してマスクを掛けるだけ。再取得はしない）
+    with st.expander("絞り込み・検索"):
+        search = st.text_input("コード・銘柄名で検索（前方一致）", key="rule1_search")
+        mult_lo, mult_hi = index.mult_bounds()
+        mult_range = None
+        if mult_hi > mult_lo:
+            mult_range = st.slider("倍率", mult_lo, mult_hi, (mult_lo, mult_hi), step=0.01, key=f"rule1_mult_{data_source}")
+        # JPX の一覧が取れているときだけ出す（一覧が無いと判定できないため）
+        exclude_etf = False
+        if etf_codes():
+            exclude_etf = st.checkbox("ETF・ETN を除外", value=False, key="rule1_exclude_etf")
+            st.caption(f"※ JPX の東証上場銘柄一覧（{etf_list_date()} 取得）で判定しています。")
+        exclude_text = st.text_input("除外する銘柄コード（カンマ区切り）", DEFAULT_EXCLUDE_CODES, key="rule1_exclude")
+    exclude_codes = {c.strip() for c in exclude_text.replace("、", ",").split(",") if c.strip()}
+
+    view_cols = st.columns(2)
+    with view_cols[0]:
+        sort_label = st.selectbox("並び順", list(SORT_OPTIONS), key="rule1_sort")
+    with view_cols[1]:
+        page_size = st.selectbox("1ページの表示件数", PAGE_SIZES, index=1, key="rule1_page_size")
+
+    sort_key, ascending = SORT_OPTIONS[sort_label]
+    if sort_key == "高値からの距離":
+        index = build_index(df, with_prices=True)
+    df = index.query(
+        search=search,
+        exclude_codes=exclude_codes,
+        exclude_etf=exclude_etf,
+        mult_range=mult_range,
+        sort=sort_key,
+        ascending=ascending,
+    )
 
 if df.empty:
     st.info("データがありません。")
 else:
+    # 日付・絞り込み・並び順・件数が変わったら1ページ目に戻す
+    view_state = (data_source, search, mult_range, exclude_etf, frozenset(exclude_codes), sort_label, page_size)
+    if st.session_state.get("rule1_view") != view_state:
+        st.session_state["rule1_view"] = view_state
+        st.session_state["rule1_page"] = 0
+
+    total_rows = len(df)
+    total_pages = max((total_rows + page_size - 1) // page_size, 1)
+    st.session_state["rule1_page"] = min(st.session_state["rule1_page"], total_pages - 1)
+    start = st.session_state["rule1_page"] * page_size
+
+    # 🔽 表示するページ分だけを切り出す（チャート取得・描画もこの範囲のみ）
+    df_page = df.iloc[start:start + page_size]
+
+    render_pager(total_pages, total_rows, "top")
+
     # -------------------------------------------------------------
     # 🌟 共通スタイルを定義 (単一行で定義)
     # -------------------------------------------------------------
@@ -143,7 +262,8 @@ else:
     # ホバー時のアクション（共通）
     hover_attr = 'onmouseover="this.style.backgroundColor=\'#e8e8e8\'" onmouseout="this.style.backgroundColor=\'#f0f2f6\'"'
 
-    for _, row in df.iterrows():
+    cards_t0 = time.perf_counter()
+    for _, row in df_page.iterrows():
         code = row["code"]
         name = row.get("name", "")
         
@@ -168,6 +288,12 @@ else:
                 📈 高値 ： {row["high"]}（{row["high_date"]}）
             </div>
         """, unsafe_allow_html=True)
+
+        # 「すべて」のときは、どの日の抽出に載っていたかを出す
+        if "出現日" in row:
+            st.caption(f"出現日：{row['出現日']}（{row['出現回数']}回）")
+        if pd.notna(row.get("current_price")):
+            st.caption(f"現在値：{row['current_price']:,.0f}（高値から {row['from_high_pct']:+.2f}%）")
         
         # 1. 詳細・半値押し計算へ のボタン (単一行f-string)
         detail_button_html = f'<a href="{code_link}" target="_blank" style="{button_style}" {hover_attr} title="別ページで詳細な計算結果とチャートを確認します。">詳細・半値押し計算へ</a>'
@@ -182,45 +308,17 @@ else:
         st.markdown(detail_button_html + kabutan_finance_button_html + kabutan_news_button_html, unsafe_allow_html=True)
 
 
-        try:
-            candle_url = "https://app.kumagai-stock.com/api/candle"
-            resp = requests.get(candle_url, params={"code": code})
-            resp.raise_for_status()
-            chart_data = resp.json().get("data", [])
-
-            if chart_data:
-                df_chart = pd.DataFrame(chart_data)
-                df_chart["date_str"] = pd.to_datetime(df_chart["date"]).dt.strftime("%Y-%m-%d")
-
-                fig = go.Figure(data=[
-                    go.Candlestick(
-                        x=df_chart["date_str"],
-                        open=df_chart["open"],
-                        high=df_chart["high"],
-                        low=df_chart["low"],
-                        close=df_chart["close"],
-                        increasing_line_color='red',
-                        decreasing_line_color='blue',
-                        hoverinfo="skip"
-                    )
-                ])
-                fig.update_layout(
-                    margin=dict(l=10, r=10, t=10, b=10),
-                    xaxis=dict(visible=False, type="category"),
-                    yaxis=dict(visible=False),
-                    xaxis_rangeslider_visible=False,
-                    height=200,
-                    plot_bgcolor='#f8f8f8',  # チャート背景を薄いグレーに
-                    paper_bgcolor='#f8f8f8'
-                )
-                st.plotly_chart(fig, width='stretch', config={"displayModeBar": False, "staticPlot": True})
-            else:
-                st.caption("（チャートデータなし）")
-        except Exception as e:
-            st.caption(f"（エラー: {e}）")
+        # 🔽 チャートは枠だけ先に置いておき、取得できた順に後から埋める
+        slot = st.empty()
+        slot.caption("（チャート読み込み中…）")
+        chart_slots.setdefault(str(code), []).append(slot)
 
     st.markdown("<hr style='border-top: 2px solid #ccc;'>", unsafe_allow_html=True)
 
+    record("section", "rule1.cards", time.perf_counter() - cards_t0)
+
+    render_pager(total_pages, total_rows, "bottom")
+
 st.markdown("""
 <div style='
     border: 1px solid red;
@@ -250,4 +348,16 @@ st.markdown("""
 '>
 &copy; 2025 KumagaiNext All rights reserved.
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# -------------------------------------------------------------
+# 🔽 ページ全体を出したあとで、チャートを取得できた順に埋める
+# -------------------------------------------------------------
+if chart_slots:
+    with section("rule1.charts"):
+        for code, df_chart in iter_candles(chart_slots):
+            for slot in chart_slots[code]:
+                render_chart(slot, code, df_chart)
+
+
+page_end(page_timer)
@@ -0,0 +1,213 @@
+"""
+ページ描画とデータ取得のベンチマーク
+
+モックの Tower API（tools/mock_tower_api.py）を立ち上げ、銘柄数を変えた合成データに対して
+各ページを Streamlit の AppTest でヘッドレス実行する。
+1回ごとに別プロセスで実行するので、キャッシュや日足ストアは毎回空の状態から始まる。
+
+    python benchmarks/bench_pages.py
+    python benchmarks/bench_pages.py --sizes 10 100 --pages rule1 --latency candle=0.05
+    python benchmarks/bench_pages.py --compare benchmarks/results/<前回>.json
+
+結果は JSON（既定は benchmarks/results/<コミット>-<日時>.json）に保存する。
+各ページについて初回表示（cold）と、そのままの再実行（rerun）を計測する。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.request import urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from mock_tower_api import MockTowerAPI, SyntheticData, _parse_latency  # noqa: E402
+
+PAGES = {
+    "rule1": "app_rise_TEST.py",
+    "watch_list": os.path.join("pages", "watch_list.py"),
+    "rule2": os.path.join("pages", "rule2.py"),
+}
+DEFAULT_SIZES = [10, 100, 500, 2000]
+
+# watch_list 用：Supabase には接続しない（マイ監視リストは空の状態で始める）
+DUMMY_SUPABASE_URL = "http://127.0.0.1:9"
+DUMMY_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark"
+
+
+# -------------------------------------------------------------
+# 子プロセス側：1ページを AppTest で実行して計測値を出力
+# -------------------------------------------------------------
+def _count_elements(node) -> int:
+    children = getattr(node, "children", None)
+    if not children:
+        return 1
+    return sum(_count_elements(c) for c in children.values())
+
+
+def _mock_stats(base: str) -> dict:
+    with urlopen(f"{base}/__stats", timeout=5) as resp:
+        return json.load(resp)
+
+
+def _mock_reset(base: str):
+    urlopen(f"{base}/__reset", timeout=5).close()
+
+
+def run_worker(page: str, timeout: float) -> dict:
+    import resource
+    import tracemalloc
+
+    import pandas as pd
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, ROOT)
+    base = os.environ["TOWER_API_BASE"]
+
+    at = AppTest.from_file(os.path.join(ROOT, PAGES[page]), default_timeout=timeout)
+    at.session_state["authenticated"] = True
+    at.session_state["my_watchlist"] = {
+        "df": pd.DataFrame(columns=["id", "code", "name", "half_retrace", "current_price", "distance_percent"]),
+        "pending_add": [],
+        "pending_delete": set(),
+        "next_tmp_id": -1,
+    }
+
+    result = {}
+    tracemalloc.start()
+    for phase in ("cold", "rerun"):
+        _mock_reset(base)
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        at.run()
+        wall = time.perf_counter() - t0
+        stats = _mock_stats(base)
+        result[phase] = {
+            "wall_sec": round(wall, 4),
+            "http_calls": stats["requests"],
+            "http_errors": stats["errors"],
+            "http_bytes": stats["bytes"],
+            "http_by_endpoint": stats["by_endpoint"],
+            "py_peak_mem_bytes": tracemalloc.get_traced_memory()[1],
+            "elements": _count_elements(at.main) + _count_elements(at.sidebar),
+            "exceptions": [str(e.value) for e in at.exception],
+        }
+    tracemalloc.stop()
+    result["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+# -------------------------------------------------------------
+# 親プロセス側：モックを立ち上げ、ページ×銘柄数ごとに子プロセスを起動
+# -------------------------------------------------------------
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def run_suite(pages, sizes, latency, bars, timeout) -> dict:
+    api = MockTowerAPI(latency=latency).start()
+    results = []
+    try:
+        for size in sizes:
+            api.data = SyntheticData(codes=size, bars=bars)
+            for page in pages:
+                with tempfile.TemporaryDirectory() as tmp:
+                    env = {
+                        **os.environ,
+                        "TOWER_API_BASE": api.base_url,
+                        "CANDLE_STORE_PATH": os.path.join(tmp, "candles.sqlite3"),
+                        "CACHE_WARMER": "0",
+                        "SUPABASE_URL": DUMMY_SUPABASE_URL,
+                        "SUPABASE_KEY": DUMMY_SUPABASE_KEY,
+                    }
+                    proc = subprocess.run(
+                        [sys.executable, __file__, "--worker", page, "--timeout", str(timeout)],
+                        env=env, cwd=ROOT, capture_output=True, text=True,
+                    )
+                if proc.returncode != 0:
+                    entry = {"page": page, "codes": size, "error": proc.stderr.strip().splitlines()[-1:]}
+                else:
+                    entry = {"page": page, "codes": size, **json.loads(proc.stdout.strip().splitlines()[-1])}
+                results.append(entry)
+                print(_format_row(entry), flush=True)
+    finally:
+        api.stop()
+
+    return {
+        "revision": _git_rev(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "latency": latency,
+        "bars": bars,
+        "results": results,
+    }
+
+
+def _format_row(entry: dict) -> str:
+    if "error" in entry:
+        return f"{entry['page']:<11} {entry['codes']:>5}  ERROR {entry['error']}"
+    c, r = entry["cold"], entry["rerun"]
+    return (
+        f"{entry['page']:<11} {entry['codes']:>5}  "
+        f"cold {c['wall_sec']:>7.2f}s {c['http_calls']:>5} req {c['http_bytes'] / 1024:>8.0f} KiB "
+        f"{c['elements']:>5} el | rerun {r['wall_sec']:>7.2f}s {r['http_calls']:>5} req"
+    )
+
+
+def compare(current: dict, previous_path: str):
+    """前回の結果との差分（wall time）を表示する"""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    prev = {(e["page"], e["codes"]): e for e in previous["results"] if "error" not in e}
+    print(f"\n--- vs {previous.get('revision')} ({previous.get('timestamp')}) ---")
+    for e in current["results"]:
+        p = prev.get((e["page"], e["codes"]))
+        if "error" in e or p is None:
+            continue
+        for phase in ("cold", "rerun"):
+            before, after = p[phase]["wall_sec"], e[phase]["wall_sec"]
+            ratio = (after - before) / before * 100 if before else 0.0
+            print(f"{e['page']:<11} {e['codes']:>5} {phase:<5} {before:>7.2f}s -> {after:>7.2f}s ({ratio:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="合成データの銘柄数")
+    parser.add_argument("--bars", type=int, default=250, help="1銘柄あたりの日足の本数")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="モックの応答遅延（秒）。'candle=0.05' のようにエンドポイント別にも指定可")
+    parser.add_argument("--timeout", type=float, default=300, help="1回の実行のタイムアウト（秒）")
+    parser.add_argument("--out", help="結果の保存先 JSON")
+    parser.add_argument("--compare", help="比較する前回の結果 JSON")
+    parser.add_argument("--worker", choices=list(PAGES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.timeout), ensure_ascii=False))
+        return
+
+    report = run_suite(args.pages, args.sizes, _parse_latency(args.latency), args.bars, args.timeout)
+
+    out = args.out or os.path.join(
+        ROOT, "benchmarks", "results", f"{report['revision']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nsaved: {out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from candle_data import CANDLE_MAX_WORKERS, last_trading_day, prefetch_candles
+from candle_store import save_names, sync_candles
+from etf_list import ETF_REFRESH_PERIOD, refresh_etf_codes
+from screening_data import (
+    BATCH_PERIOD,
+    BREAKOUT_PERIOD,
+    HIGHLOW_CHECK,
+    LIVE_PERIOD,
+    current_all_highlow,
+    load_batch,
+    load_breakouts,
+    probe_all_highlow_versions,
+    refresh_live_prices,
+    time_bucket,
+)
+
+logger = logging.getLogger(__name__)
+
+WARM_LEAD = 90      # 区切りの何秒前に次の区切りの分を取得しておくか
+TICK = 15           # 確認の間隔（秒）
+
+# CACHE_WARMER=0 でバックグラウンド更新を止める（ローカル検証用）
+ENABLED = os.getenv("CACHE_WARMER", "1") != "0"
+
+
+def warm_highlow(bucket: int):
+    """本日〜5日前の抽出結果（更新されていれば最新）と、載っている銘柄の日足を用意する"""
+    # バージョンを確かめ（ETag などが無ければ本文のハッシュ）、画面側はその結果を読むだけにする。
+    # 「すべて」の一覧を作ると、各日の抽出結果も同時にキャッシュされる
+    probe_all_highlow_versions()
+    df = current_all_highlow()
+    if "code" in df.columns:
+        if "name" in df.columns:
+            save_names(zip(df["code"].astype(str), df["name"]))
+        prefetch_candles(df["code"].astype(str))
+
+
+def warm_batch(bucket: int):
+    """現在値つき batch と、batch に載っている全銘柄の日足（ローカル判定の対象）を用意する"""
+    df, _ = load_batch(bucket)
+    # 画面に出すわけではないので、メモリ上の日足置き場（SharedCandles）には載せずディスクだけ更新する
+    trading_day = last_trading_day()
+
+    def sync(code):
+        try:
+            sync_candles(code, trading_day)
+        except Exception:
+            logger.warning("cache warmer: candle sync failed for %s", code)
+
+    with ThreadPoolExecutor(max_workers=CANDLE_MAX_WORKERS) as executor:
+        list(executor.map(sync, df.index))
+
+
+def warm_breakouts(bucket: int):
+    """ブレイク銘柄一覧と、その銘柄の日足を用意する"""
+    records = load_breakouts(bucket)
+    save_names((rec.get("code"), rec.get("name")) for rec in records)
+    prefetch_candles(rec.get("code", "") for rec in records if rec.get("code"))
+
+
+def warm_live(bucket: int):
+    """マイ監視リストの現在値パネル用の batch（パネルが開かれているときだけ取り直す）"""
+    refresh_live_prices()
+
+
+def warm_etf_codes(bucket: int):
+    """ETF・ETN の銘柄コード一覧を JPX から取り直す（Rule 1 の ETF 除外用）"""
+    refresh_etf_codes()
+
+
+# (名前, 区切り, 先取りする秒数, 処理)。highlow は今のバージョンを確かめるだけなので先取りしない
+JOBS = [
+    ("highlow", HIGHLOW_CHECK, 0, warm_highlow),
+    ("batch", BATCH_PERIOD, WARM_LEAD, warm_batch),
+    ("breakouts", BREAKOUT_PERIOD, WARM_LEAD, warm_breakouts),
+    ("live", LIVE_PERIOD, 0, warm_live),
+    ("etf_codes", ETF_REFRESH_PERIOD, 0, warm_etf_codes),
+]
+
+
+def _run():
+    warmed = {}
+    while True:
+        now = time.time()
+        for name, period, lead, job in JOBS:
+            bucket = time_bucket(period, now)
+            # 区切りの直前になったら、次の区切りの分を先に取得しておく
+            if lead and now >= (bucket + 1) * period - lead:
+                bucket += 1
+            if warmed.get(name) == bucket:
+                continue
+            # 失敗しても同じ区切りでは再試行しない（遅いAPIを叩き続けないため）
+            warmed[name] = bucket
+            try:
+                job(bucket)
+            except Exception:
+                logger.exception("cache warmer: %s failed", name)
+        time.sleep(TICK)
+
+
+@st.cache_resource
+def start_cache_warmer():
+    """プロセスに1つだけ、キャッシュを温めるスレッドを起動する"""
+    if not ENABLED:
+        return None
+    thread = threading.Thread(target=_run, name="cache-warmer", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,141 @@
+"""
+株式分割・併合の補正
+
+銘柄ごとの比率（権利落ち日, 1株 → ratio 株）を持っておき、
+権利落ち日より前の株価に 1 / ratio の累積積を掛けて、今の株数ベースにそろえる。
+"""
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from candle_store import delete_factor, load_factors, save_factor
+
+
+def cumulative_factors(dates: np.ndarray, f_dates: np.ndarray, f_ratios: np.ndarray) -> np.ndarray:
+    """各足の日付に掛ける係数（その日より後の権利落ちの 1 / ratio をすべて掛けたもの）"""
+    if not len(f_dates):
+        return np.ones(len(dates))
+    order = np.argsort(f_dates)
+    f_dates, f_ratios = f_dates[order], f_ratios[order]
+    suffix = np.append(np.cumprod((1.0 / f_ratios)[::-1])[::-1], 1.0)
+    return suffix[np.searchsorted(f_dates, dates, side="right")]
+
+
+def adjust_ohlc(dates: np.ndarray, ohlc: np.ndarray, f_dates: np.ndarray, f_ratios: np.ndarray) -> np.ndarray:
+    """日付×OHLC の配列に係数を一度に掛ける（比率が無ければそのまま返す）"""
+    if not len(f_dates):
+        return ohlc
+    return ohlc * cumulative_factors(dates, f_dates, f_ratios)[:, None]
+
+
+class FactorTable:
+    """
+    分割・併合の比率の置き場（プロセスで1つ）。
+    version は比率が記録・削除されるたびに増える（補正済みデータのキャッシュキー用）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self):
+        df = load_factors()
+        df["code"] = df["code"].astype(str)
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+        by_code = {
+            code: (g["date"].to_numpy(), g["ratio"].to_numpy(dtype=np.float64))
+            for code, g in df.groupby("code", sort=False)
+        }
+        with self._lock:
+            self._df = df
+            self._by_code = by_code
+            self.version = getattr(self, "version", 0) + 1
+
+    @property
+    def empty(self) -> bool:
+        return self._df.empty
+
+    def frame(self) -> pd.DataFrame:
+        return self._df.copy()
+
+    def for_code(self, code: str) -> tuple[np.ndarray, np.ndarray]:
+        """(権利落ち日の配列, 比率の配列)。無ければ空の配列"""
+        with self._lock:
+            return self._by_code.get(str(code), (np.array([], dtype="datetime64[ns]"), np.array([])))
+
+    def code_signature(self, code: str) -> str:
+        """
+        銘柄ごとの比率の指紋（チャートのキャッシュキー用）。
+        記録数ではなく (日付, 比率) の中身から作るので、削除して記録し直した場合も変わる。
+        """
+        f_dates, f_ratios = self.for_code(code)
+        if not len(f_dates):
+            return ""
+        text = ";".join(f"{d}:{r!r}" for d, r in zip(f_dates.astype("datetime64[D]").astype(str), f_ratios.tolist()))
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+    def point_factors(self, codes: pd.Series, dates: pd.Series) -> np.ndarray:
+        """
+        (銘柄, 日付) の組ごとの係数をまとめて求める。
+        比率のある銘柄の行だけを比率表と結合し、権利落ち日より前の分を掛け合わせる。
+        """
+        out = np.ones(len(codes))
+        with self._lock:
+            table = self._df
+        if table.empty:
+            return out
+        rows = pd.DataFrame({
+            "code": codes.astype(str).to_numpy(),
+            "date": pd.to_datetime(dates, errors="coerce").to_numpy(),
+            "row": np.arange(len(codes)),
+        })
+        m = rows.merge(table, on="code", suffixes=("", "_ex"))
+        m = m[m["date"] < m["date_ex"]]
+        if m.empty:
+            return out
+        prod = (1.0 / m["ratio"]).groupby(m["row"]).prod()
+        out[prod.index.to_numpy()] = prod.to_numpy()
+        return out
+
+    def record(self, code: str, date: str, ratio: float):
+        save_factor(str(code), date, ratio)
+        self._reload()
+
+    def remove(self, code: str, date: str):
+        delete_factor(str(code), date)
+        self._reload()
+
+
+@st.cache_resource
+def factor_table() -> FactorTable:
+    return FactorTable()
+
+
+def adjust_highlow(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    抽出結果の high / low を、high_date / low_date 時点からの分割・併合で補正する。
+    補正した行は、API の半値押しまでの距離を現在値から計算し直す。
+    """
+    table = factor_table()
+    if table.empty or df.empty or not {"code", "high", "low", "high_date", "low_date"} <= set(df.columns):
+        return df
+
+    high_f = table.point_factors(df["code"], df["high_date"])
+    low_f = table.point_factors(df["code"], df["low_date"])
+    changed = (high_f != 1.0) | (low_f != 1.0)
+    if not changed.any():
+        return df
+
+    df = df.assign(
+        high=(pd.to_numeric(df["high"], errors="coerce") * high_f).round(2),
+        low=(pd.to_numeric(df["low"], errors="coerce") * low_f).round(2),
+    )
+    if {"current_price", "halfPriceDistancePercent"} <= set(df.columns):
+        half = (df["high"] + df["low"]) / 2
+        current = pd.to_numeric(df["current_price"], errors="coerce")
+        distance = ((current - half) / half * 100).round(2)
+        df["halfPriceDistancePercent"] = df["halfPriceDistancePercent"].where(~changed, distance)
+    return df
@@ -0,0 +1,74 @@
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+from perf import cache_resource, lazy_import
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+UP_COLOR = "red"        # 陽線：赤
+DOWN_COLOR = "blue"     # 陰線：青
+BAND_COLOR = "orange"   # もみ合いレンジ
+
+# 日本語ホバー（1本ごとの文字列は作らず、列の値をテンプレートで差し込む）
+HOVER_TEMPLATE = (
+    "日付：%{x|%Y-%m-%d}<br>"
+    "始値：%{open:,}<br>"
+    "高値：%{high:,}<br>"
+    "安値：%{low:,}<br>"
+    "終値：%{close:,}"
+    "<extra></extra>"
+)
+
+
+def candle_figure(df: pd.DataFrame, base_high: float | None = None, base_low: float | None = None,
+                  height: int = 400) -> "go.Figure":
+    """日足の DataFrame（日付インデックス、昇順）からローソク足の Figure を作る"""
+    # plotly は重いので、最初のチャートを作るときに読み込む
+    go = lazy_import("plotly.graph_objects")
+    fig = go.Figure(
+        data=[
+            go.Candlestick(
+                x=df.index,
+                open=df["open"].to_numpy(),
+                high=df["high"].to_numpy(),
+                low=df["low"].to_numpy(),
+                close=df["close"].to_numpy(),
+                name="日足",
+                increasing_line_color=UP_COLOR,
+                decreasing_line_color=DOWN_COLOR,
+                hovertemplate=HOVER_TEMPLATE,
+            )
+        ]
+    )
+
+    # もみ合いの高値〜安値を帯で重ねる
+    if base_high is not None and base_low is not None:
+        fig.add_hrect(
+            y0=base_low, y1=base_high,
+            fillcolor=BAND_COLOR, opacity=0.12, line_width=0, layer="below",
+        )
+        for y in (base_high, base_low):
+            fig.add_hline(y=y, line_color=BAND_COLOR, line_width=1, line_dash="dot")
+
+    fig.update_layout(
+        xaxis_title="日付",
+        yaxis_title="株価（円）",
+        xaxis_rangeslider_visible=False,
+        height=height,
+        margin=dict(l=40, r=20, t=40, b=40),
+    )
+    return fig
+
+
+# -------------------------------------------------------------
+# (銘柄コード, chart_key, 帯) ごとに作成済みの Figure を使い回す
+# -------------------------------------------------------------
+@cache_resource(max_entries=1000, show_spinner=False)
+def cached_candle_figure(code: str, data_key: str, _df: pd.DataFrame, base_high: float | None = None,
+                         base_low: float | None = None, height: int = 400) -> "go.Figure":
+    """
+    作成と検証は初回だけ。戻り値は共有されるので、呼び出し側で書き換えないこと。
+    """
+    return candle_figure(_df, base_high=base_high, base_low=base_low, height=height)
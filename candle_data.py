@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from candle_adjust import adjust_ohlc, factor_table
+from candle_store import load_candles, retry_at
+from perf import cache_event, timed
+
+JST = ZoneInfo("Asia/Tokyo")
+
+CANDLE_MAX_WORKERS = 8      # 同時に投げるリクエスト数の上限
+
+
+# -------------------------------------------------------------
+# キャッシュキー用：直近の営業日（土日を除く）
+# -------------------------------------------------------------
+def last_trading_day(now: datetime | None = None) -> str:
+    """日本時間で直近の平日を YYYYMMDD で返す（祝日は考慮しない）"""
+    d = (now or datetime.now(JST)).date()
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d.strftime("%Y%m%d")
+
+
+# -------------------------------------------------------------
+# 日足は1日1回しか変わらないので、銘柄×営業日で保持する
+# st.cache_data はヒットのたびに DataFrame を複製するため、
+# プロセス共有の読み取り専用配列に載せて、各セッションにはビューを渡す
+# -------------------------------------------------------------
+OHLC_COLUMNS = ["open", "high", "low", "close"]
+MAX_CODES = 5000    # 保持する銘柄数の上限（古いものから捨てる）
+
+
+class CandleArrays:
+    """1銘柄分の日足（日付と OHLC を連続した読み取り専用の配列で持つ）"""
+
+    def __init__(self, trading_day: str, dates: np.ndarray, ohlc: np.ndarray):
+        self.trading_day = trading_day
+        self.retry_at = None    # 前営業日の足がまだ無かったとき、ディスクから読み直す時刻
+        self.dates = pd.DatetimeIndex(dates, name="dt")
+        self.ohlc = np.ascontiguousarray(ohlc, dtype=np.float64)
+        self.ohlc.flags.writeable = False
+
+    @classmethod
+    def from_frame(cls, trading_day: str, df: pd.DataFrame, factors: tuple | None = None) -> "CandleArrays":
+        """factors は (権利落ち日, 比率) の配列の組。あれば分割・併合を補正した値で持つ"""
+        if df.empty:
+            return cls(trading_day, np.array([], dtype="datetime64[ns]"), np.empty((0, len(OHLC_COLUMNS))))
+        dt = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
+        df = df.assign(dt=dt)[dt.notna()].sort_values("dt").drop_duplicates("dt", keep="last")
+        dates = df["dt"].to_numpy()
+        ohlc = df[OHLC_COLUMNS].to_numpy(dtype=np.float64)
+        if factors is not None:
+            ohlc = adjust_ohlc(dates, ohlc, *factors)
+        return cls(trading_day, dates, ohlc)
+
+    def frame(self) -> pd.DataFrame:
+        """配列を複製せずに DataFrame として見せる（書き換え不可）"""
+        return pd.DataFrame(self.ohlc, index=self.dates, columns=OHLC_COLUMNS, copy=False)
+
+
+class SharedCandles:
+    def __init__(self, max_codes: int = MAX_CODES):
+        self.max_codes = max_codes
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code: str, trading_day: str) -> pd.DataFrame:
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None and entry.trading_day == trading_day \
+                    and (entry.retry_at is None or time.time() < entry.retry_at):
+                self._entries.move_to_end(code)
+                cache_event("SharedCandles", miss=False)
+                return entry.frame()
+
+        # ディスク上の日足ストア（新しい足だけ追記）から読み込み、分割・併合を補正して持つ
+        cache_event("SharedCandles", miss=True)
+        with timed("cache_miss", "SharedCandles"):
+            factors = factor_table().for_code(code)
+            entry = CandleArrays.from_frame(trading_day, load_candles(code, trading_day), factors)
+            entry.retry_at = retry_at(code)
+
+        with self._lock:
+            self._entries[code] = entry
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.max_codes:
+                self._entries.popitem(last=False)
+        return entry.frame()
+
+    def invalidate(self, code: str | None = None):
+        """新しい足や株式分割などで中身が変わったときに呼ぶ（None なら全銘柄）"""
+        with self._lock:
+            if code is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(code), None)
+
+
+@st.cache_resource
+def shared_candles() -> SharedCandles:
+    """プロセスに1つだけの日足置き場"""
+    return SharedCandles()
+
+
+def invalidate_candles(code=None):
+    shared_candles().invalidate(code)
+
+
+def record_split(code, date: str, ratio: float):
+    """分割・併合（date は権利落ち日 YYYY-MM-DD、1株 → ratio 株）を記録し、その銘柄だけ補正し直す"""
+    factor_table().record(str(code), date, ratio)
+    invalidate_candles(str(code))
+
+
+def remove_split(code, date: str):
+    factor_table().remove(str(code), date)
+    invalidate_candles(str(code))
+
+
+def chart_key(code, df: pd.DataFrame) -> str:
+    """チャートのキャッシュキー（最終足の日付＋その銘柄の分割・併合の比率の指紋）"""
+    return f"{df.index[-1]:%Y-%m-%d}:{factor_table().code_signature(str(code))}"
+
+
+def last_n_days(df: pd.DataFrame, days: int) -> pd.DataFrame:
+    """最終日から数えて days 日分（暦日）に絞る（ビューのまま返す）"""
+    if df.empty:
+        return df
+    start = df.index.searchsorted(df.index[-1] - timedelta(days=days))
+    return df.iloc[start:]
+
+
+def get_candles(code, days: int | None = None) -> pd.DataFrame:
+    """日時インデックス付きの日足を返す（days 指定で直近N日に絞る）。中身は書き換えないこと"""
+    df = shared_candles().get(str(code), last_trading_day())
+    if days is not None:
+        df = last_n_days(df, days)
+    return df
+
+
+def _get_candles_safe(code, days):
+    try:
+        return get_candles(code, days)
+    except Exception as e:
+        return e
+
+
+def prefetch_candles(codes, days: int | None = None) -> dict:
+    """
+    複数銘柄の日足をまとめて並列取得する。
+    戻り値は {code: DataFrame または 例外オブジェクト}。
+    """
+    codes = list(dict.fromkeys(str(c) for c in codes))
+    if not codes:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(CANDLE_MAX_WORKERS, len(codes))) as executor:
+        return dict(zip(codes, executor.map(lambda c: _get_candles_safe(c, days), codes)))
+
+
+def iter_candles(codes, days: int | None = None):
+    """
+    複数銘柄の日足を並列取得し、取得できた順に (code, DataFrame または 例外) を返す。
+    先に画面の枠だけ出しておき、届いたものから描画するときに使う。
+    """
+    codes = list(dict.fromkeys(str(c) for c in codes))
+    if not codes:
+        return
+    with ThreadPoolExecutor(max_workers=min(CANDLE_MAX_WORKERS, len(codes))) as executor:
+        futures = {executor.submit(_get_candles_safe, c, days): c for c in codes}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from tower_api import get_frame
+
+# 保存先（Render の永続ディスクを使う場合は CANDLE_STORE_PATH で指定）
+STORE_PATH = os.getenv(
+    "CANDLE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "candles.sqlite3"),
+)
+
+CANDLE_READ_TIMEOUT = 10    # 読み取り10秒
+SYNC_RETRY = 600            # 前営業日の足がまだ無いときに取り直すまでの秒数
+OHLC_COLUMNS = ["open", "high", "low", "close"]
+
+_write_lock = threading.Lock()
+_initialized = False
+_retry_at: dict = {}    # code -> 次に取り直してよい時刻（前営業日の足が揃っていない銘柄）
+
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    if not _initialized:
+        os.makedirs(os.path.dirname(STORE_PATH), exist_ok=True)
+    conn = sqlite3.connect(STORE_PATH, timeout=30)
+    if not _initialized:
+        with _write_lock:
+            if not _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS candles (
+                        code  TEXT NOT NULL,
+                        date  TEXT NOT NULL,
+                        open  REAL,
+                        high  REAL,
+                        low   REAL,
+                        close REAL,
+                        PRIMARY KEY (code, date)
+                    ) WITHOUT ROWID;
+                    CREATE TABLE IF NOT EXISTS candle_sync (
+                        code        TEXT PRIMARY KEY,
+                        synced_day  TEXT NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS code_names (
+                        code  TEXT PRIMARY KEY,
+                        name  TEXT NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS candle_factors (
+                        code   TEXT NOT NULL,
+                        date   TEXT NOT NULL,
+                        ratio  REAL NOT NULL,
+                        PRIMARY KEY (code, date)
+                    ) WITHOUT ROWID;
+                """)
+                conn.commit()
+                _initialized = True
+    return conn
+
+
+def _read(conn: sqlite3.Connection, code: str) -> pd.DataFrame:
+    return pd.read_sql_query(
+        "SELECT date, open, high, low, close FROM candles WHERE code = ? ORDER BY date",
+        conn,
+        params=(code,),
+    )
+
+
+def load_panel(since: str | None = None) -> pd.DataFrame:
+    """
+    保存済みの全銘柄の日足を縦持ち（code, date, open, high, low, close）で返す。
+    since（YYYY-MM-DD）以降に絞れる。スクリーニング用。
+    """
+    sql = "SELECT code, date, open, high, low, close FROM candles"
+    params: tuple = ()
+    if since is not None:
+        sql += " WHERE date >= ?"
+        params = (since,)
+    with closing(_connect()) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def _fetch_new_bars(code: str, last_date: str | None) -> pd.DataFrame:
+    """API から日足を取得し、保存済みの最終日より新しい足だけを返す"""
+    df = get_frame("/api/candle", params={"code": code}, read_timeout=CANDLE_READ_TIMEOUT, key="data")
+    if df.empty:
+        return df
+
+    dt = pd.to_datetime(df["date"].astype(str), errors="coerce")
+    df = df.assign(date=dt.dt.strftime("%Y-%m-%d"))[dt.notna()].copy()
+    for col in OHLC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    if last_date is not None:
+        df = df[df["date"] > last_date]
+    return df[["date"] + OHLC_COLUMNS]
+
+
+def _previous_trading_day(trading_day: str) -> str:
+    """trading_day（YYYYMMDD）の前の平日を YYYY-MM-DD で返す（祝日は考慮しない）"""
+    d = datetime.strptime(trading_day, "%Y%m%d").date() - timedelta(days=1)
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d.strftime("%Y-%m-%d")
+
+
+def _sync(conn: sqlite3.Connection, code: str, trading_day: str):
+    """
+    trading_day の同期がまだなら、保存済みより新しい足だけを API から追記する。
+    同期済みにするのは前営業日の足まで揃ったときだけ。
+    まだ無ければ（API 側の更新待ち）SYNC_RETRY 秒たってから取り直す。
+    """
+    row = conn.execute("SELECT synced_day FROM candle_sync WHERE code = ?", (code,)).fetchone()
+    if row is not None and row[0] >= trading_day:
+        return
+
+    last = conn.execute("SELECT MAX(date) FROM candles WHERE code = ?", (code,)).fetchone()[0]
+    if last is not None and time.time() < _retry_at.get(code, 0):
+        return
+    try:
+        new_bars = _fetch_new_bars(code, last)
+    except Exception:
+        if last is None:
+            raise
+        _retry_at[code] = time.time() + SYNC_RETRY
+        return
+
+    dates = [last] if new_bars.empty else [last, *new_bars["date"]]
+    newest = max([d for d in dates if d is not None], default=None)
+    synced = newest is not None and newest >= _previous_trading_day(trading_day)
+    with _write_lock:
+        conn.executemany(
+            "INSERT OR REPLACE INTO candles (code, date, open, high, low, close) VALUES (?, ?, ?, ?, ?, ?)",
+            [(code, *r) for r in new_bars.itertuples(index=False, name=None)],
+        )
+        if synced:
+            conn.execute(
+                "INSERT OR REPLACE INTO candle_sync (code, synced_day) VALUES (?, ?)",
+                (code, trading_day),
+            )
+        conn.commit()
+    if synced:
+        _retry_at.pop(code, None)
+    else:
+        _retry_at[code] = time.time() + SYNC_RETRY
+
+
+def retry_at(code: str) -> float | None:
+    """前営業日の足が揃っていない銘柄の、次に取り直す時刻（揃っていれば None）"""
+    return _retry_at.get(code)
+
+
+def sync_candles(code: str, trading_day: str):
+    """ディスク上の日足を trading_day まで更新するだけ（読み込みはしない。スクリーニング対象の先読み用）"""
+    with closing(_connect()) as conn:
+        _sync(conn, code, trading_day)
+
+
+def load_candles(code: str, trading_day: str) -> pd.DataFrame:
+    """
+    ディスク上の日足を返す。
+    trading_day の同期がまだなら、保存済みより新しい足だけを追記してから返す。
+    API が落ちていても保存済みのデータがあればそれを返す。
+    """
+    with closing(_connect()) as conn:
+        _sync(conn, code, trading_day)
+        return _read(conn, code)
+
+
+# -------------------------------------------------------------
+# 銘柄名（抽出結果・ブレイク一覧に載った名前を覚えておく。ローカル判定の表示用）
+# -------------------------------------------------------------
+def save_names(pairs):
+    """(code, name) の組を保存する（同じコードは新しい名前で上書き）"""
+    rows = [(str(code), name) for code, name in pairs if code and name]
+    if not rows:
+        return
+    with closing(_connect()) as conn, _write_lock:
+        conn.executemany("INSERT OR REPLACE INTO code_names (code, name) VALUES (?, ?)", rows)
+        conn.commit()
+
+
+def load_names() -> dict:
+    with closing(_connect()) as conn:
+        return dict(conn.execute("SELECT code, name FROM code_names").fetchall())
+
+
+# -------------------------------------------------------------
+# 株式分割・併合の比率（date は権利落ち日。ratio は 1株 → ratio 株）
+# -------------------------------------------------------------
+def load_factors() -> pd.DataFrame:
+    with closing(_connect()) as conn:
+        return pd.read_sql_query("SELECT code, date, ratio FROM candle_factors ORDER BY code, date", conn)
+
+
+def save_factor(code: str, date: str, ratio: float):
+    with closing(_connect()) as conn, _write_lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO candle_factors (code, date, ratio) VALUES (?, ?, ?)",
+            (code, date, float(ratio)),
+        )
+        conn.commit()
+
+
+def delete_factor(code: str, date: str):
+    with closing(_connect()) as conn, _write_lock:
+        conn.execute("DELETE FROM candle_factors WHERE code = ? AND date = ?", (code, date))
+        conn.commit()
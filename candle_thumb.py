@@ -0,0 +1,67 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+from perf import cache_data
+
+UP_COLOR = "red"        # 陽線：赤
+DOWN_COLOR = "blue"     # 陰線：青
+BG_COLOR = "#f8f8f8"    # チャート背景（薄いグレー）
+
+
+def candle_svg(df: pd.DataFrame, width: int = 600, height: int = 200, margin: int = 10) -> str:
+    """OHLC の DataFrame からローソク足の SVG 文字列を作る（軸・ラベルなし）"""
+    o = df["open"].to_numpy(dtype=float)
+    h = df["high"].to_numpy(dtype=float)
+    l = df["low"].to_numpy(dtype=float)
+    c = df["close"].to_numpy(dtype=float)
+
+    n = len(df)
+    lo, hi = np.nanmin(l), np.nanmax(h)
+    span = (hi - lo) or 1.0
+    plot_w = width - 2 * margin
+    plot_h = height - 2 * margin
+
+    step = plot_w / n
+    x = margin + step * (np.arange(n) + 0.5)
+    body_w = max(step * 0.7, 1.0)
+
+    def y(v):
+        return margin + (hi - v) / span * plot_h
+
+    y_o, y_h, y_l, y_c = y(o), y(h), y(l), y(c)
+    top = np.minimum(y_o, y_c)
+    body_h = np.maximum(np.abs(y_o - y_c), 1.0)
+    up = c >= o
+
+    def path(mask):
+        # ヒゲと実体を1本の path にまとめて要素数を抑える
+        idx = np.flatnonzero(mask & ~np.isnan(o + h + l + c))
+        return "".join(
+            f"M{x[i]:.1f} {y_h[i]:.1f}V{y_l[i]:.1f}"
+            f"M{x[i] - body_w / 2:.1f} {top[i]:.1f}h{body_w:.1f}v{body_h[i]:.1f}h{-body_w:.1f}Z"
+            for i in idx
+        )
+
+    return (
+        f"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {width} {height}' preserveAspectRatio='none'>"
+        f"<rect width='100%' height='100%' fill='{BG_COLOR}'/>"
+        f"<path d='{path(up)}' stroke='{UP_COLOR}' fill='{UP_COLOR}' stroke-width='1'/>"
+        f"<path d='{path(~up)}' stroke='{DOWN_COLOR}' fill='{DOWN_COLOR}' stroke-width='1'/>"
+        f"</svg>"
+    )
+
+
+# -------------------------------------------------------------
+# (銘柄コード, chart_key＝最終足の日付と分割・併合の比率) ごとにキャッシュ
+# -------------------------------------------------------------
+@cache_data(max_entries=3000, show_spinner=False)
+def thumbnail_html(code: str, data_key: str, _df: pd.DataFrame, height: int = 200) -> str:
+    """カードにそのまま埋め込める <img> タグ（SVG の data URI）を返す"""
+    svg = candle_svg(_df, height=height)
+    b64 = base64.b64encode(svg.encode("utf-8")).decode("ascii")
+    return (
+        f"<img src='data:image/svg+xml;base64,{b64}' alt='{code}' "
+        f"style='width:100%; height:{height}px; display:block;'>"
+    )
@@ -0,0 +1,71 @@
+"""
+ETF・ETN の銘柄コード一覧（JPX の「東証上場銘柄一覧」から作る）
+
+「市場・商品区分」が ETF・ETN の銘柄コードを 1 行 1 コードで ETF_CODES_PATH に保存する。
+キャッシュウォーマーが 1 日 1 回取り直すほか、手動でも更新できる:
+
+    python tools/update_etf_codes.py
+"""
+import io
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+JPX_LIST_URL = "https://www.jpx.co.jp/markets/statistics-equities/misc/tvdivq0000001vg2-att/data_j.xls"
+ETF_CATEGORY = "ETF・ETN"
+ETF_REFRESH_PERIOD = 86400     # 一覧を取り直す間隔（秒）
+
+ETF_CODES_PATH = os.getenv(
+    "ETF_CODES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "etf_codes.txt"),
+)
+
+_lock = threading.Lock()
+_loaded: tuple = (None, frozenset())    # (ファイルの更新時刻, コードの集合)
+
+
+def refresh_etf_codes(path: str = ETF_CODES_PATH, url: str = JPX_LIST_URL) -> int:
+    """JPX の一覧を取得して保存し、ETF・ETN の銘柄数を返す（.xls の読み込みに xlrd が必要）"""
+    resp = requests.get(url, timeout=(5, 60))
+    resp.raise_for_status()
+    df = pd.read_excel(io.BytesIO(resp.content), dtype=str)
+    if not {"コード", "市場・商品区分"} <= set(df.columns):
+        raise ValueError(f"想定外の列です: {list(df.columns)}")
+
+    codes = sorted(set(df.loc[df["市場・商品区分"].str.strip() == ETF_CATEGORY, "コード"].str.strip()))
+    if not codes:
+        raise ValueError("ETF・ETN が1件もありません（一覧の形式が変わった可能性があります）")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(f"# {ETF_CATEGORY}（{url}、{datetime.now():%Y-%m-%d} 取得）\n")
+        f.write("".join(f"{code}\n" for code in codes))
+    os.replace(tmp, path)
+    return len(codes)
+
+
+def etf_codes(path: str = ETF_CODES_PATH) -> frozenset:
+    """保存済みの一覧（ファイルが更新されたら読み直す。まだ無ければ空）"""
+    global _loaded
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return frozenset()
+    with _lock:
+        if _loaded[0] != mtime:
+            with open(path, encoding="utf-8") as f:
+                lines = [line.split("#", 1)[0].strip() for line in f]
+            _loaded = (mtime, frozenset(line.zfill(4) for line in lines if line))
+        return _loaded[1]
+
+
+def etf_list_date(path: str = ETF_CODES_PATH) -> str | None:
+    """一覧を保存した日（画面の注記用）"""
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d")
+    except OSError:
+        return None
@@ -0,0 +1,205 @@
+"""
+手元の日足ストア（candle_store）を使ったローカルのスクリーニング
+
+日足を「日付 × 銘柄」の行列にして、期間の max/min で全銘柄を一度に判定する。
+判定の対象は日足ストアに入っている銘柄。キャッシュウォーマーが batch（現在値つき）に載っている
+全銘柄の日足をディスクに取りに行くので、ページで表示されたことのない銘柄も含まれる。
+銘柄名も日足ストアに保存されたものを使う（判定中に API は呼ばない）。
+"""
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from candle_adjust import factor_table
+from candle_data import last_trading_day
+from candle_store import load_names, load_panel
+from perf import cache_data
+
+OHLC_COLUMNS = ["open", "high", "low", "close"]
+
+
+# -------------------------------------------------------------
+# 日付 × 銘柄 の価格行列
+# -------------------------------------------------------------
+@cache_data(ttl=3600, show_spinner=False)
+def load_price_matrix(trading_day: str, days: int, factor_version: int = 0) -> dict:
+    """
+    直近 days 日（暦日）の open/high/low/close を、それぞれ 日付×銘柄 の DataFrame で返す。
+    分割・併合を補正した値。factor_version は比率が記録されたときに作り直すためのキー。
+    """
+    since = (datetime.strptime(trading_day, "%Y%m%d") - timedelta(days=days)).strftime("%Y-%m-%d")
+    panel = load_panel(since)
+    if panel.empty:
+        return {}
+    panel["date"] = pd.to_datetime(panel["date"], format="%Y-%m-%d")
+    panel[OHLC_COLUMNS] = panel[OHLC_COLUMNS].mul(factor_table().point_factors(panel["code"], panel["date"]), axis=0)
+    return {col: panel.pivot(index="date", columns="code", values=col).sort_index() for col in OHLC_COLUMNS}
+
+
+def price_matrix(trading_days: int) -> dict:
+    """営業日数で指定して価格行列を取得する"""
+    return load_price_matrix(last_trading_day(), int(trading_days * 7 / 5) + 10, factor_table().version)
+
+
+def code_names() -> dict:
+    """
+    日足ストアに覚えてある銘柄名を {code: name} で返す。
+    名前はキャッシュウォーマーが抽出結果・ブレイク一覧から保存する（ここでは API を呼ばない）。
+    """
+    return load_names()
+
+
+# -------------------------------------------------------------
+# ルール2：5ヶ月もみ合いからのブレイク
+# -------------------------------------------------------------
+class BreakoutScreener:
+    """
+    直前 window 営業日の高値・安値の幅が max_range 以内（もみ合い）で、
+    終値がその高値を breakout_pct 以上うわまわった日をブレイクとする。
+    日ごとの判定結果を保持しておき、新しい足が来たらその日だけ計算する。
+    """
+
+    def __init__(self, window: int = 100, max_range: float = 0.35, breakout_pct: float = 0.0,
+                 lookback: int = 5):
+        self.window = window
+        self.max_range = max_range
+        self.breakout_pct = breakout_pct
+        self.lookback = lookback
+        self._by_day: dict = {}
+        self._lock = threading.Lock()
+
+    def _detect_day(self, high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame, i: int) -> pd.DataFrame:
+        """i 日目（行番号）のブレイクを全銘柄まとめて判定する"""
+        start = max(i - self.window, 0)
+        past_high = high.iloc[start:i]
+        past_low = low.iloc[start:i]
+
+        # 窓の8割以上の足がある銘柄だけを対象にする
+        enough = past_high.count() >= int(self.window * 0.8)
+        base_high = past_high.max()
+        base_low = past_low.min()
+        day_close = close.iloc[i]
+
+        hit = (
+            enough
+            & (base_high / base_low - 1 <= self.max_range)
+            & (day_close > base_high * (1 + self.breakout_pct))
+        )
+        codes = hit.index[hit.to_numpy(dtype=bool)]
+        return pd.DataFrame({
+            "code": codes,
+            "base_high": base_high[codes].to_numpy(),
+            "base_low": base_low[codes].to_numpy(),
+            "break_date": high.index[i].strftime("%Y%m%d"),
+            "break_close": day_close[codes].to_numpy(),
+        })
+
+    def run(self, matrix: dict, names: dict | None = None, data_key=None) -> list:
+        """
+        直近 lookback 営業日のブレイクを、API と同じ形の dict のリストで返す。
+        data_key は行列の中身が変わったとき（分割・併合の補正など）に日ごとの結果を作り直すためのキー。
+        """
+        if not matrix:
+            return []
+        high, low, close = matrix["high"], matrix["low"], matrix["close"]
+        n_days = len(high.index)
+
+        parts = []
+        with self._lock:
+            wanted = set()
+            for i in range(max(n_days - self.lookback, 0), n_days):
+                key = (high.index[i], high.shape[1], data_key)
+                wanted.add(key)
+                if key not in self._by_day:
+                    self._by_day[key] = self._detect_day(high, low, close, i)
+                parts.append(self._by_day[key])
+            # 古い日の結果は捨てる
+            self._by_day = {k: v for k, v in self._by_day.items() if k in wanted}
+
+        parts = [p for p in parts if not p.empty]
+        if not parts:
+            return []
+
+        # 銘柄ごとに一番新しいブレイクだけを残す
+        df = (
+            pd.concat(parts, ignore_index=True)
+            .sort_values(["break_date", "code"], ascending=[False, True])
+            .drop_duplicates("code", keep="first")
+        )
+        names = names or {}
+        df.insert(1, "name", df["code"].map(names).fillna(""))
+        df[["base_high", "base_low", "break_close"]] = df[["base_high", "base_low", "break_close"]].astype(np.float64)
+        return df.to_dict("records")
+
+
+@st.cache_resource
+def get_breakout_screener(window: int, max_range: float, breakout_pct: float, lookback: int) -> BreakoutScreener:
+    """パラメータごとにプロセスで1つ（日ごとの判定結果を使い回す）"""
+    return BreakoutScreener(window=window, max_range=max_range, breakout_pct=breakout_pct, lookback=lookback)
+
+
+def local_breakouts(window: int = 100, max_range: float = 0.35, breakout_pct: float = 0.0,
+                    lookback: int = 5) -> list:
+    screener = get_breakout_screener(window, max_range, breakout_pct, lookback)
+    return screener.run(price_matrix(window + lookback), names=code_names(), data_key=factor_table().version)
+
+
+# -------------------------------------------------------------
+# ルール1：短期間での急騰（高値 ÷ 期間内の安値）
+# -------------------------------------------------------------
+RULE1_COLUMNS = ["code", "name", "high", "high_date", "low", "low_date", "倍率"]
+
+
+def surge_screen(matrix: dict, offset: int = 0, lookback: int = 10, min_mult: float = 1.3,
+                 max_mult: float = 2.0, names: dict | None = None) -> pd.DataFrame:
+    """
+    offset 営業日前に、直前 lookback 営業日の中での最高値をつけ、
+    その期間の安値からの倍率が min_mult〜max_mult の銘柄を全銘柄まとめて判定する。
+    /api/highlow/<day> と同じ列（code, name, high, high_date, low, low_date, 倍率）で返す。
+    """
+    if not matrix:
+        return pd.DataFrame(columns=RULE1_COLUMNS)
+    high, low = matrix["high"], matrix["low"]
+    d = len(high.index) - 1 - offset
+    if d < 1:
+        return pd.DataFrame(columns=RULE1_COLUMNS)
+    start = max(d - lookback, 0)
+
+    day_high = high.iloc[d].to_numpy(dtype=np.float64)
+    window_high = high.iloc[start:d + 1].max().to_numpy(dtype=np.float64)
+
+    # 期間内の安値とその日付（欠損は inf にして argmin の対象外にする）
+    past_low = low.iloc[start:d + 1].to_numpy(dtype=np.float64)
+    past_low = np.where(np.isnan(past_low), np.inf, past_low)
+    low_idx = past_low.argmin(axis=0)
+    lowest = past_low[low_idx, np.arange(past_low.shape[1])]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mult = day_high / lowest
+    hit = (
+        np.isfinite(mult)
+        & (day_high >= window_high)
+        & (mult >= min_mult)
+        & (mult <= max_mult)
+    )
+
+    codes = high.columns[hit]
+    names = names or {}
+    df = pd.DataFrame({
+        "code": codes,
+        "name": [names.get(c, "") for c in codes],
+        "high": day_high[hit],
+        "high_date": high.index[d].strftime("%Y-%m-%d"),
+        "low": lowest[hit],
+        "low_date": high.index[start:d + 1][low_idx[hit]].strftime("%Y-%m-%d"),
+        "倍率": mult[hit].round(2),
+    })
+    return df.sort_values("倍率", ascending=False, ignore_index=True)
+
+
+def local_surges(offset: int = 0, lookback: int = 10, min_mult: float = 1.3, max_mult: float = 2.0) -> pd.DataFrame:
+    matrix = price_matrix(offset + lookback + 1)
+    return surge_screen(matrix, offset, lookback, min_mult, max_mult, names=code_names())
@@ -0,0 +1,102 @@
+import json
+import time
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+import perf
+from admin_auth import require_admin
+
+
+require_admin()
+
+
+# ==============================================================
+st.markdown("## ⏱ パフォーマンス診断")
+
+WINDOWS = {"直近5分": 300, "直近30分": 1800, "直近2時間": 7200, "すべて": None}
+window = st.radio("集計期間", list(WINDOWS), index=1, horizontal=True)
+since = time.time() - WINDOWS[window] if WINDOWS[window] else None
+
+snap = perf.snapshot(since=since)
+timings = pd.DataFrame(snap["timings"])
+
+MS_COLUMNS = ["p50", "p90", "p99", "max", "total"]
+
+
+def to_ms(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for col in MS_COLUMNS:
+        df[col] = (df[col] * 1000).round(1)
+    return df
+
+
+if timings.empty:
+    st.info("まだ計測データがありません。各ページを開くと集計されます。")
+else:
+    timings = to_ms(timings)
+
+    st.markdown("### 遅いエンドポイント（API・Supabase）")
+    calls = timings[timings["kind"].isin(["api", "supabase"])]
+    st.dataframe(
+        calls.sort_values("p90", ascending=False),
+        hide_index=True,
+        width="stretch",
+    )
+
+    st.markdown("### ページ・描画区間")
+    st.dataframe(
+        timings[timings["kind"].isin(["page", "section"])].sort_values("p90", ascending=False),
+        hide_index=True,
+        width="stretch",
+    )
+
+    st.markdown("### 遅延読み込み・初期化（import / init）")
+    st.caption("起動時の import の内訳は `python tools/startup_profile.py` で確認できます。")
+    st.dataframe(
+        timings[timings["kind"].isin(["import", "init"])].sort_values("max", ascending=False),
+        hide_index=True,
+        width="stretch",
+    )
+
+    st.markdown("### キャッシュ関数（呼び出し時間 / ミス時の実行時間）")
+    st.dataframe(
+        timings[timings["kind"].isin(["cache", "cache_miss"])].sort_values(["name", "kind"]),
+        hide_index=True,
+        width="stretch",
+    )
+
+st.markdown("### キャッシュのヒット率（プロセス起動から）")
+caches = pd.DataFrame(snap["caches"])
+if caches.empty:
+    st.caption("データなし")
+else:
+    st.dataframe(
+        caches.sort_values("calls", ascending=False),
+        hide_index=True,
+        width="stretch",
+        column_config={"hit_ratio": st.column_config.ProgressColumn(min_value=0, max_value=1, format="%.2f")},
+    )
+
+st.markdown("### セッションごとの実行コスト（秒）")
+sessions = pd.DataFrame(snap["sessions"])
+if sessions.empty:
+    st.caption("データなし")
+else:
+    sessions["last_at"] = pd.to_datetime(sessions["last_at"], unit="s")
+    st.dataframe(sessions.sort_values("last_at", ascending=False), hide_index=True, width="stretch")
+
+# --- エクスポート・リセット ---
+cols = st.columns(2)
+with cols[0]:
+    st.download_button(
+        "JSON をダウンロード",
+        data=json.dumps(perf.snapshot(), ensure_ascii=False, indent=2),
+        file_name=f"perf-{datetime.now():%Y%m%d-%H%M%S}.json",
+        mime="application/json",
+    )
+with cols[1]:
+    if st.button("計測値をリセット"):
+        perf.reset()
+        st.rerun()
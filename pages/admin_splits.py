@@ -0,0 +1,47 @@
+from datetime import date
+
+import streamlit as st
+
+from admin_auth import require_admin
+from candle_adjust import factor_table
+from candle_data import record_split, remove_split
+
+
+require_admin()
+
+
+# ==============================================================
+st.markdown("## ✂️ 株式分割・併合の登録")
+st.caption("登録すると、その銘柄の日足（チャート・ローカル判定）と監視リストの半値押しが補正後の株価になります。")
+
+with st.form("add_split"):
+    cols = st.columns(3)
+    with cols[0]:
+        code = st.text_input("銘柄コード")
+    with cols[1]:
+        ex_date = st.date_input("権利落ち日", value=date.today())
+    with cols[2]:
+        ratio = st.number_input("1株 → N株（併合は 0.1 など）", min_value=0.001, value=2.0, step=0.5, format="%.3f")
+    submitted = st.form_submit_button("登録")
+
+if submitted:
+    code = code.strip()
+    if not code:
+        st.error("銘柄コードを入力してください。")
+    else:
+        record_split(code, ex_date.strftime("%Y-%m-%d"), ratio)
+        st.success(f"{code}：{ex_date:%Y-%m-%d} に 1株 → {ratio:g}株 を登録しました。")
+
+st.markdown("### 登録済み")
+factors = factor_table().frame()
+if factors.empty:
+    st.caption("データなし")
+else:
+    factors["date"] = factors["date"].dt.strftime("%Y-%m-%d")
+    st.dataframe(factors.sort_values(["code", "date"]), hide_index=True, width="stretch")
+
+    options = list(factors[["code", "date"]].itertuples(index=False, name=None))
+    target = st.selectbox("削除する登録", options, format_func=lambda t: f"{t[0]}（{t[1]}）")
+    if st.button("削除"):
+        remove_split(*target)
+        st.rerun()
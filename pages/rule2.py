@@ -1,12 +1,11 @@
 import streamlit as st
-import requests
-import pandas as pd
-from datetime import datetime, timedelta
-import os
-import plotly.graph_objects as go
-
-# Tower API のベースURL
-API_BASE = os.getenv("TOWER_API_BASE", "https://app.kumagai-stock.com")
+from datetime import datetime
+from candle_chart import cached_candle_figure
+from candle_data import chart_key, iter_candles
+from cache_warmer import start_cache_warmer
+from local_screener import local_breakouts
+from perf import page_end, page_start
+from screening_data import BREAKOUT_PERIOD, load_breakouts, time_bucket
 
 
 st.markdown("""
@@ -20,44 +19,17 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# 5ヶ月もみ合いブレイク銘柄一覧を取得
-@st.cache_data(ttl=60)
+# 5ヶ月もみ合いブレイク銘柄一覧を取得（バックグラウンドで先読み）
+start_cache_warmer()
+
+page_timer = page_start("rule2")
+
 def fetch_breakouts():
-    url = f"{API_BASE}/api/pattern/5m_breakout"
-    resp = requests.get(url, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
-    if not data:
-        return []
-    return data
-
-
-# 5ヶ月分のチャート（終値）を取得
-@st.cache_data(ttl=300)
-def fetch_candle_5m(code: str):
-    url = f"{API_BASE}/api/candle"
-    params = {"code": code}
-    resp = requests.get(url, params=params, timeout=60)
-    resp.raise_for_status()
-    j = resp.json()
-
-    cd = j.get("code")
-    rows = j.get("data", [])
-    if not rows:
-        return cd, pd.DataFrame()
-
-    df = pd.DataFrame(rows)  # date, open, high, low, close
-    # dateは "YYYYMMDD" 想定
-    df["dt"] = pd.to_datetime(df["date"].astype(str), format="%Y%m%d", errors="coerce")
-    df = df.dropna(subset=["dt"]).sort_values("dt")
-
-    # 直近5ヶ月（ざっくり155日）に絞る
-    if not df.empty:
-        end_dt = df["dt"].max()
-        start_dt = end_dt - timedelta(days=155)
-        df = df[df["dt"] >= start_dt]
-
-    return cd, df
+    return load_breakouts(time_bucket(BREAKOUT_PERIOD))
+
+
+# 5ヶ月分のチャート（共通の日足キャッシュから直近5ヶ月＝ざっくり155日を切り出す）
+FIVE_MONTH_DAYS = 155
 
 
 # =========================
@@ -65,12 +37,29 @@ def fetch_candle_5m(code: str):
 # =========================
 st.markdown(f"## 「ルール2」スクリーニング")
 
-with st.spinner("サーバーからデータ取得中…"):
-    try:
-        records = fetch_breakouts()
-    except Exception as e:
-        st.error(f"API呼び出し中にエラーが発生しました: {e}")
-        st.stop()
+mode = st.radio("抽出方法", ["サーバー", "ローカル計算"], horizontal=True, key="rule2_mode")
+
+if mode == "ローカル計算":
+    # 手元の日足ストアから、条件を変えてその場で判定する
+    with st.expander("判定条件", expanded=True):
+        window = st.slider("もみ合い期間（営業日）", 40, 160, 100, step=5)
+        max_range = st.slider("もみ合いの値幅（上限 %）", 10, 80, 35, step=5) / 100
+        breakout_pct = st.slider("ブレイクの判定（高値から + %）", 0.0, 10.0, 0.0, step=0.5) / 100
+        lookback = st.slider("ブレイクした日（直近 N 営業日以内）", 1, 20, 5)
+    with st.spinner("ローカルで判定中…"):
+        try:
+            records = local_breakouts(window, max_range, breakout_pct, lookback)
+        except Exception as e:
+            st.error(f"ローカル判定中にエラーが発生しました: {e}")
+            st.stop()
+    st.caption("※ 判定対象は手元に日足が保存されている銘柄のみです。")
+else:
+    with st.spinner("サーバーからデータ取得中…"):
+        try:
+            records = fetch_breakouts()
+        except Exception as e:
+            st.error(f"API呼び出し中にエラーが発生しました: {e}")
+            st.stop()
 
 if not records:
     st.info("現在、条件に合致する銘柄はありません。")
@@ -78,7 +67,29 @@ if not records:
 
 st.success(f"抽出銘柄数：{len(records)} 銘柄")
 
-# 銘柄ごとにカード表示
+show_band = st.checkbox("もみ合いレンジをチャートに表示", value=True, key="rule2_band")
+
+
+# 5ヶ月チャートを描画（slot は st.empty() の枠）
+def render_candle_chart(slot, code, df_candle, base_high=None, base_low=None):
+    if isinstance(df_candle, Exception) or df_candle.empty:
+        slot.warning("チャートデータが取得できませんでした。")
+        return
+
+    if not show_band:
+        base_high = base_low = None
+    fig = cached_candle_figure(str(code), chart_key(code, df_candle), df_candle, base_high=base_high, base_low=base_low)
+
+    # 上のツールバーを非表示
+    slot.plotly_chart(
+        fig,
+        use_container_width=True,
+        config={"displayModeBar": False},
+    )
+
+
+# 銘柄ごとにカード表示（テキストはすぐに出す）
+chart_slots = {}
 for rec in records:
     code = rec.get("code", "")
     name = rec.get("name", "")
@@ -103,73 +114,17 @@ for rec in records:
     st.markdown(f"<p class='small-line'><b>📉もみ合い安値：</b> {base_low:,.0f} 円</p>", unsafe_allow_html=True)
     st.markdown(f"<p class='small-line'><b>📌ブレイクポイント：</b> {break_close:,.0f} 円（{break_date_disp}）</p>", unsafe_allow_html=True)
 
-    # === 5ヶ月チャート ===
-    _, df_candle = fetch_candle_5m(code)
-    if df_candle.empty:
-        st.warning("チャートデータが取得できませんでした。")
-    else:
-
-        df_plot = df_candle.sort_values("dt")
-
-        # ==== 日本語ホバー用テキストを作成 ====
-        hover_text = [
-            "日付：{d}<br>"
-            "始値：{o:,}<br>"
-            "高値：{h:,}<br>"
-            "安値：{l:,}<br>"
-            "終値：{c:,}".format(
-                d=dt.strftime("%Y-%m-%d"),
-                o=o,
-                h=h,
-                l=l,
-                c=c,
-            )
-            for dt, o, h, l, c in zip(
-                df_plot["dt"],
-                df_plot["open"],
-                df_plot["high"],
-                df_plot["low"],
-                df_plot["close"],
-            )
-        ]
-
-        fig = go.Figure(
-            data=[
-                go.Candlestick(
-                    x=df_plot["dt"],
-                    open=df_plot["open"],
-                    high=df_plot["high"],
-                    low=df_plot["low"],
-                    close=df_plot["close"],
-                    name="日足",
-                    increasing_line_color="red",   # 陽線：赤
-                    decreasing_line_color="blue",  # 陰線：青
-                    hovertext=hover_text,          # ★ 日本語テキストを渡す
-                    hoverinfo="text",              # ★ hovertextだけ表示
-                )
-            ]
-        )
-
-        fig.update_layout(
-            xaxis_title="日付",
-            yaxis_title="株価（円）",
-            xaxis_rangeslider_visible=False,
-            height=400,
-            margin=dict(l=40, r=20, t=40, b=40),
-        )
-
-        # 上のツールバーを非表示
-        st.plotly_chart(
-            fig,
-            use_container_width=True,
-            config={"displayModeBar": False},
-        )
-
-
+    # === 5ヶ月チャート（枠だけ先に置き、取得できた順に後から埋める） ===
+    slot = st.empty()
+    slot.caption("（チャート読み込み中…）")
+    chart_slots.setdefault(str(code), []).append((slot, base_high, base_low))
 
     st.markdown("---")
 
+# 日足が届いた銘柄から順にチャートを埋める
+for code, df_candle in iter_candles(chart_slots, days=FIVE_MONTH_DAYS):
+    for slot, base_high, base_low in chart_slots[code]:
+        render_candle_chart(slot, code, df_candle, base_high, base_low)
 
 
-
-
+page_end(page_timer)
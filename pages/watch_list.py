@@ -1,16 +1,33 @@
 import os
 import streamlit as st
-from supabase import create_client, Client
 import pandas as pd
-import requests
 import uuid
 import hashlib
-from requests.exceptions import ReadTimeout, RequestException
-
-
-# --- ① Supabase接続関数（まず定義） ---
-@st.cache_resource
-def init_connection() -> Client | None:
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+from cache_warmer import start_cache_warmer
+from candle_adjust import adjust_highlow, factor_table
+from perf import lazy_import, page_end, page_start, section, timed
+from screening_data import (
+    BATCH_COLUMNS,
+    BATCH_PERIOD,
+    current_highlow,
+    live_prices,
+    load_batch,
+    time_bucket,
+)
+from watch_alerts import STATUS_NEAR, STATUS_REACHED, evaluate_alerts
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+JST = ZoneInfo("Asia/Tokyo")
+
+
+# --- ① Supabase の接続情報（secrets.toml または環境変数） ---
+def supabase_credentials() -> tuple[str | None, str | None]:
     url = None
     key = None
 
@@ -25,32 +42,29 @@ def init_connection() -> Client | None:
         url = os.environ.get("SUPABASE_URL")
     if not key:
         key = os.environ.get("SUPABASE_KEY")
+    return url, key
 
+
+# --- ② クライアントは初めてDBを使うときに作る（supabase の import もそのときまで遅らせる） ---
+@st.cache_resource
+def init_connection() -> "Client | None":
+    url, key = supabase_credentials()
     if not url or not key:
         return None
 
-    return create_client(url, key)
+    supabase = lazy_import("supabase")
+    with timed("init", "supabase.create_client"):
+        return supabase.create_client(url, key)
 
-# --- ② Supabase クライアント作成 ---
-supabase: Client | None = init_connection()
 
-# --- ③ 接続がなければ停止 ---
-if supabase is None:
+# --- ③ 接続情報がなければ停止（ここでは接続しない） ---
+if not all(supabase_credentials()):
     st.error(
         "Supabase 接続情報が設定されていません。\n"
         "secrets.toml または SUPABASE_URL / SUPABASE_KEY を設定してください。"
     )
     st.stop()
 
-
-# ③ そのあとにチェック（←これをいきなりファイルの先頭に書かない）
-if supabase is None:
-    st.error(
-        "Supabase 接続情報が設定されていません。\n"
-        "secrets.toml または環境変数 SUPABASE_URL / SUPABASE_KEY を設定してください。"
-    )
-    st.stop()
-
 if "session_key" not in st.session_state:
     st.session_state["session_key"] = hashlib.sha256(
         ("guest" + str(uuid.uuid4())).encode()
@@ -58,9 +72,28 @@ if "session_key" not in st.session_state:
 
 SESSION_KEY = st.session_state["session_key"]
 
+# 抽出結果・現在値をバックグラウンドで先読み
+start_cache_warmer()
+
+page_timer = page_start("watch_list")
+
+# --- マイ監視リストの状態（セッション内に保持し、書き込みはまとめて反映） ---
+MY_COLUMNS = ["id", "code", "name", "half_retrace", "current_price", "distance_percent", "created_at"]
+
+if "my_watchlist" not in st.session_state:
+    st.session_state["my_watchlist"] = {
+        "df": None,              # 表示用の DataFrame（None なら未読込）
+        "pending_add": [],       # まだ insert していない行（仮IDつき）
+        "pending_delete": set(), # まだ delete していない id
+        "next_tmp_id": -1,       # 仮ID（負の数）
+    }
+
+MY_STATE = st.session_state["my_watchlist"]
+
+
 def add_to_watch_list(code, name, half_retrace, current_price, distance_percent):
-    """マイ監視リストに1銘柄追加"""
-    if not supabase or not SESSION_KEY:
+    """マイ監視リストに1銘柄追加（画面にはすぐ反映し、DBへは次の flush でまとめて登録）"""
+    if not SESSION_KEY:
         st.error("データベース接続またはセッションIDが未確立です。")
         return
 
@@ -73,6 +106,21 @@ def add_to_watch_list(code, name, half_retrace, current_price, distance_percent)
         "current_price": float(current_price) if current_price is not None else None,
         "distance_percent": float(distance_percent) if distance_percent is not None else None,
     }
+
+    tmp_id = MY_STATE["next_tmp_id"]
+    MY_STATE["next_tmp_id"] -= 1
+    MY_STATE["pending_add"].append((tmp_id, payload))
+
+    row = {
+        "id": tmp_id,
+        "created_at": datetime.now(JST).isoformat(),
+        **{k: payload[k] for k in MY_COLUMNS if k not in ("id", "created_at")},
+    }
+    df = MY_STATE["df"] if MY_STATE["df"] is not None else pd.DataFrame(columns=MY_COLUMNS)
+    MY_STATE["df"] = pd.concat([pd.DataFrame([row]), df], ignore_index=True)
+    st.toast(f"銘柄 {name}（{code}）をマイ監視リストに追加しました。")
+
+
 def fmt_num(val, fmt="{:.2f}"):
     """None / NaN を '-' にして表示"""
     if val is None:
@@ -88,137 +136,147 @@ def fmt_num(val, fmt="{:.2f}"):
     except Exception:
         return str(val)
 
-    try:
-        resp = supabase.table("watch_list").insert(payload).execute()
-        if resp.data:
-            st.success(f"銘柄 **{name}（{code}）** をマイ監視リストに追加しました。")
-    except Exception as e:
-        st.error(f"マイ監視リストへの登録中にエラーが発生しました: {e}")
         
 # ② RシステムPRO用 API
-@st.cache_data(ttl=900)
-def load_batch_current() -> pd.DataFrame:
-    """現在値付きの batch を 1回だけ取得してキャッシュ"""
-    batch_url = "https://app.kumagai-stock.com/api/highlow/batch"
-    try:
-        res = requests.get(batch_url, timeout=(3, 7))  # 接続3秒 + 読み取り7秒
-        res.raise_for_status()
-        df = pd.DataFrame(res.json())
-        if df.empty:
-            return pd.DataFrame()
-        # 必要な列だけ残す
-        cols = ["code", "current_price", "halfPriceDistancePercent"]
-        return df[[c for c in cols if c in df.columns]].copy()
-    except ReadTimeout:
-        st.warning("現在値の取得がタイムアウトしました。半値押しは表示されますが、現在値・距離は空欄になります。")
-        return pd.DataFrame()
-    except RequestException as e:
-        st.warning(f"現在値の取得に失敗しました: {e}")
-        return pd.DataFrame()
+RSYSTEM_SOURCES = [
+    ("本日", "today"),
+    ("2日前", "target2day"),
+    ("3日前", "target3day"),
+]
 
-@st.cache_data(ttl=300)
-def load_rsystem_data(source_key: str) -> pd.DataFrame:
-    """
-    本日・2日前・3日前の抽出結果に、
-    可能なら batch から現在値をマージして返す。
-    batch が失敗してもページは落とさない。
-    """
-    url_map = {
-        "today":      "https://app.kumagai-stock.com/api/highlow/today",
-        "target2day": "https://app.kumagai-stock.com/api/highlow/target2day",
-        "target3day": "https://app.kumagai-stock.com/api/highlow/target3day",
-    }
-    base_url = url_map.get(source_key, url_map["today"])
 
-    # ① ベース（高値・安値など）
+def load_batch_current() -> tuple[pd.DataFrame, str | None]:
+    """現在値付きの batch（15分ごとの区切りで共有キャッシュ）"""
+    return load_batch(time_bucket(BATCH_PERIOD))
+
+
+def load_rsystem_data(source_key: str) -> tuple[pd.DataFrame, str | None]:
+    """本日・2日前・3日前のいずれかの抽出結果（高値・安値など）を返す"""
+    if source_key not in ("today", "target2day", "target3day"):
+        source_key = "today"
+
     try:
-        res = requests.get(base_url, timeout=(3, 15))  # ← url → base_url に修正
-        res.raise_for_status()
-        df_base = pd.DataFrame(res.json())             # ← base_res → res に修正
+        df_base = current_highlow(source_key)
     except Exception as e:
-        st.error(f"抽出データの取得に失敗しました: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), f"抽出データの取得に失敗しました: {e}"
 
     if df_base.empty:
-        return df_base
+        return df_base, None
 
     # code を文字列ゼロ埋め
-    df_base["code"] = df_base["code"].astype(str).str.zfill(4)
+    return df_base.assign(code=df_base["code"].astype(str).str.zfill(4)), None
 
-    # ② batch で現在値などを取得（取れたらラッキー）
-    try:
-        batch_url = "https://app.kumagai-stock.com/api/highlow/batch"
-        # ★ 読み込みタイムアウトを伸ばす（30〜40秒くらい）
-        batch_res = requests.get(batch_url, timeout=(5, 40))
-        batch_res.raise_for_status()
-
-        df_batch = pd.DataFrame(batch_res.json())
-        if not df_batch.empty:
-            df_batch["code"] = df_batch["code"].astype(str).str.zfill(4)
-            df_batch = df_batch[["code", "current_price", "halfPriceDistancePercent"]]
-
-            # code で LEFT JOIN
-            df = df_base.merge(df_batch, on="code", how="left")
-        else:
-            df = df_base.copy()
-            df["current_price"] = None
-            df["halfPriceDistancePercent"] = None
 
-    except Exception as e:
-        # ★ ここで全体を落とさないのがポイント
-        st.warning(f"現在値の取得に失敗しました（{e}）。高値・安値のみで表示します。")
-        df = df_base.copy()
-        df["current_price"] = None
-        df["halfPriceDistancePercent"] = None
-
-    return df
+def load_rsystem_watchlist() -> pd.DataFrame:
+    """
+    RシステムPRO監視リスト用に、本日・2日前・3日前をまとめて取得する。
+    3つのベースと batch を並列に取得し、batch は1回だけ取りにいく。
+    batch が失敗してもページは落とさない。
+    """
+    with ThreadPoolExecutor(max_workers=len(RSYSTEM_SOURCES) + 1) as executor:
+        batch_future = executor.submit(load_batch_current)
+        base_futures = [(label, executor.submit(load_rsystem_data, key)) for label, key in RSYSTEM_SOURCES]
 
+        all_rows = []
+        for label, future in base_futures:
+            df_part, err = future.result()
+            if err:
+                st.error(err)
+            if df_part is None or df_part.empty:
+                continue
+            all_rows.append(df_part.assign(day_label=label))
 
-def load_rsystem_watchlist() -> pd.DataFrame:
-    """RシステムPRO監視リスト用に、本日・2日前・3日前をまとめて取得する"""
-    sources = [
-        ("本日", "today"),
-        ("2日前", "target2day"),
-        ("3日前", "target3day"),
-    ]
-    all_rows = []
-
-    for label, key in sources:
-        try:
-            df_part = load_rsystem_data(key)  # 既にある読み込み関数を利用
-        except Exception:
-            continue
-
-        if df_part is None or df_part.empty:
-            continue
-
-        df_part = df_part.copy()
-        df_part["day_label"] = label
-        all_rows.append(df_part)
+        df_batch, batch_err = batch_future.result()
 
     if not all_rows:
         return pd.DataFrame()
 
-    return pd.concat(all_rows, ignore_index=True)
+    df = pd.concat(all_rows, ignore_index=True)
 
+    if batch_err:
+        st.warning(batch_err)
 
+    # code で LEFT JOIN（batch が取れなかったときは空欄）
+    df = df.drop(columns=[c for c in BATCH_COLUMNS if c in df.columns])
+    if df_batch.empty:
+        for col in BATCH_COLUMNS:
+            df[col] = None
+    else:
+        df = df.join(df_batch, on="code")
 
-# ③ マイ監視リストを読み込む
-def load_my_watchlist():
-    resp = (
-        supabase.table("watch_list")
-        .select("*")
-        .eq("session_key", SESSION_KEY)
-        .eq("list_type", "my")
-        .order("id", desc=True)
-        .execute()
-    )
-    return pd.DataFrame(resp.data) if resp.data else pd.DataFrame()
+    # 高値・安値を分割・併合の補正後の株価にそろえる（半値押しもこれで計算される）
+    return adjust_highlow(df)
 
 
-# ④ マイ監視リストを削除
+
+# ③ マイ監視リストを読み込む（セッションに無いとき・再読み込み時だけサーバーへ）
+def load_my_watchlist(force=False):
+    if MY_STATE["df"] is not None and not force:
+        return MY_STATE["df"]
+
+    with timed("supabase", "watch_list.select"):
+        resp = (
+            init_connection().table("watch_list")
+            .select(",".join(MY_COLUMNS))
+            .eq("session_key", SESSION_KEY)
+            .eq("list_type", "my")
+            .order("id", desc=True)
+            .execute()
+        )
+    MY_STATE["df"] = pd.DataFrame(resp.data, columns=MY_COLUMNS) if resp.data else pd.DataFrame(columns=MY_COLUMNS)
+    MY_STATE["pending_add"] = []
+    MY_STATE["pending_delete"] = set()
+    return MY_STATE["df"]
+
+
+# ④ マイ監視リストを削除（画面からはすぐ消し、DBへは次の flush でまとめて削除）
 def delete_my_item(item_id):
-    supabase.table("watch_list").delete().eq("id", item_id).execute()
+    item_id = int(item_id)
+    df = MY_STATE["df"]
+    if df is not None:
+        MY_STATE["df"] = df[df["id"] != item_id].reset_index(drop=True)
+
+    if item_id < 0:
+        # まだ登録していない行なら insert 予定から外すだけ
+        MY_STATE["pending_add"] = [(i, p) for i, p in MY_STATE["pending_add"] if i != item_id]
+    else:
+        MY_STATE["pending_delete"].add(item_id)
+
+
+def flush_my_watchlist():
+    """保留中の追加・削除をそれぞれ1回の insert / delete でDBへ反映する"""
+    pending_add = MY_STATE["pending_add"]
+    pending_delete = MY_STATE["pending_delete"]
+    if not pending_add and not pending_delete:
+        return
+
+    try:
+        if pending_delete:
+            with timed("supabase", "watch_list.delete"):
+                (
+                    init_connection().table("watch_list")
+                    .delete()
+                    .eq("session_key", SESSION_KEY)
+                    .in_("id", sorted(pending_delete))
+                    .execute()
+                )
+            MY_STATE["pending_delete"] = set()
+
+        if pending_add:
+            with timed("supabase", "watch_list.insert"):
+                resp = init_connection().table("watch_list").insert([p for _, p in pending_add]).execute()
+            MY_STATE["pending_add"] = []
+
+            # 仮IDの行を、DBが採番した行に置き換える
+            tmp_ids = {i for i, _ in pending_add}
+            df = MY_STATE["df"]
+            df = df[~df["id"].isin(tmp_ids)]
+            if resp.data:
+                df = pd.concat([pd.DataFrame(resp.data)[MY_COLUMNS], df], ignore_index=True)
+            MY_STATE["df"] = df.sort_values("id", ascending=False, ignore_index=True)
+    except Exception as e:
+        st.error(f"マイ監視リストの保存中にエラーが発生しました: {e}")
+        load_my_watchlist(force=True)
 
 
 # ⑤ 上げ幅の半値押しを計算
@@ -226,10 +284,127 @@ def calc_half_retrace(high, low):
     return round((high + low) / 2, 2)
 
 
+# ⑥ 現在値から半値押しまでの距離（%）を計算（Series のまま一括計算）
+def calc_distance_percent(current_price, half_retrace):
+    return ((current_price - half_retrace) / half_retrace * 100).round(2)
+
+
+def adjust_my_half_retrace(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    マイ監視リストの半値押しを、登録日（created_at）より後に権利落ちした分割・併合の分だけ補正する。
+    登録時の半値押しは登録時点の株数ベースなので、そのままでは今の現在値と比べられない。
+    """
+    table = factor_table()
+    if table.empty or df.empty:
+        return df
+    registered = (
+        pd.to_datetime(df["created_at"], utc=True, errors="coerce", format="ISO8601")
+        .dt.tz_convert(JST).dt.tz_localize(None).dt.normalize()
+    )
+    factors = table.point_factors(df["code"], registered)
+    return df.assign(half_retrace=(pd.to_numeric(df["half_retrace"], errors="coerce") * factors).round(2))
+
+
+# ⑦ 現在値の自動更新パネル（fragment なので、このパネルだけが再実行される）
+LIVE_INTERVALS = {"1分": 60, "30秒": 30, "3分": 180, "停止": None}
+
+
+def render_live_prices(base: pd.DataFrame, threshold_pct: float):
+    """base（code / label / half_retrace）に最新の現在値をつなぎ、半値押しへの到達・接近を表示"""
+    # キャッシュウォーマーが取り直した現在値を読むだけ（ここでは batch を取りにいかない）。
+    # まだ無ければ、ページの表示に使った 15 分ごとの batch をそのまま使う
+    df_live, err, fetched_at = live_prices()
+    if df_live is None:
+        df_live, err = load_batch_current()
+    if err:
+        st.caption(err)
+
+    alerts = evaluate_alerts(base.assign(name=base["label"]), df_live, threshold_pct)
+
+    n_reached = int((alerts["status"] == STATUS_REACHED).sum())
+    n_near = int((alerts["status"] == STATUS_NEAR).sum())
+    if n_reached or n_near:
+        st.warning(f"🔔 半値押しに到達：{n_reached} 銘柄 ／ 接近（{threshold_pct:g}%以内）：{n_near} 銘柄")
+
+    st.dataframe(
+        pd.DataFrame({
+            "状態": alerts["status"],
+            "銘柄": alerts["name"],
+            "現在値": alerts["current_price"],
+            "半値押しまで(%)": alerts["distance"],
+        }).sort_values("半値押しまで(%)", na_position="last"),
+        hide_index=True,
+        width="stretch",
+        column_config={
+            "現在値": st.column_config.NumberColumn(format="%.1f"),
+            "半値押しまで(%)": st.column_config.NumberColumn(format="%.2f"),
+        },
+    )
+    if fetched_at is not None:
+        st.caption(f"現在値の取得時刻：{datetime.fromtimestamp(fetched_at, JST):%H:%M:%S}")
+
+
+def live_price_panel(base: pd.DataFrame, key: str):
+    """更新間隔と接近の判定幅を選んで、現在値パネルを fragment として描画する"""
+    cols = st.columns(2)
+    with cols[0]:
+        interval = st.selectbox("現在値の自動更新", list(LIVE_INTERVALS), key=f"live_interval_{key}")
+    with cols[1]:
+        threshold_pct = st.number_input(
+            "接近とみなす距離（%）", min_value=0.0, max_value=30.0, value=3.0, step=0.5,
+            key=f"alert_threshold_{key}",
+        )
+    st.fragment(render_live_prices, run_every=LIVE_INTERVALS[interval])(base, threshold_pct)
+
+
+# ⑧ RシステムPRO 監視リストを表形式に整形（全行まとめて計算）
+RSYSTEM_TABLE_COLUMNS = {
+    "day_label": "日付",
+    "label": "銘柄",
+    "half_retrace": "半値押し株価",
+    "current_price": "現在値",
+    "distance": "対半値押し比(%)",
+    "chart_url": "チャート",
+    "fin_url": "決算",
+    "news_url": "ニュース",
+}
+
+
+def build_rsystem_table(df_sys: pd.DataFrame) -> pd.DataFrame:
+    code = df_sys["code"].astype(str)
+    name = df_sys.get("name", pd.Series("", index=df_sys.index)).fillna("").astype(str)
+    high = pd.to_numeric(df_sys.get("high"), errors="coerce")
+    low = pd.to_numeric(df_sys.get("low"), errors="coerce")
+    half_retrace = ((high + low) / 2).round(2)
+    current_price = pd.to_numeric(df_sys.get("current_price"), errors="coerce")
+
+    # API の距離を優先し、無いときは現在値と半値押しから計算する
+    distance = pd.to_numeric(df_sys.get("halfPriceDistancePercent"), errors="coerce")
+    distance = distance.fillna(calc_distance_percent(current_price, half_retrace))
+
+    return pd.DataFrame({
+        "code": code,
+        "name": name,
+        "day_label": df_sys["day_label"],
+        "label": name + "（" + code + "）",
+        "half_retrace": half_retrace,
+        "current_price": current_price,
+        "distance": distance,
+        "chart_url": "https://kabutan.jp/stock/chart?code=" + code,
+        "fin_url": "https://kabutan.jp/stock/finance?code=" + code,
+        "news_url": "https://kabutan.jp/stock/news?code=" + code,
+    })
+
+
 # ==============================================================
 st.markdown("---")
 st.markdown("### 📌 マイ監視リスト")
+if st.button("🔄 再読み込み", key="reload_my_watchlist"):
+    load_my_watchlist(force=True)
+
 my_df = load_my_watchlist()
+flush_my_watchlist()
+my_df = adjust_my_half_retrace(MY_STATE["df"])
 
 if my_df.empty:
     st.info("マイ監視リストはまだ空です。")
@@ -244,9 +419,9 @@ else:
         with cols[1]:
             st.write(f"上げ幅の半値押し: {row['half_retrace']}")
         with cols[2]:
-            st.write(f"現在値: {row['current_price']}")
+            st.write(f"登録時の現在値: {row['current_price']}")
         with cols[3]:
-            st.write(f"半値押しまで: {row['distance_percent']}%")
+            st.write(f"登録時の半値押しまで: {row['distance_percent']}%")
 
         kabutan_chart = f"https://kabutan.jp/stock/chart?code={code}"
         kabutan_fin   = f"https://kabutan.jp/stock/finance?code={code}"
@@ -258,9 +433,17 @@ else:
                 f"[決算]({kabutan_fin})｜"
                 f"[ニュース]({kabutan_news})"
             )
-            if st.button("削除", key=f"del_{row['id']}"):
-                delete_my_item(row['id'])
-                st.rerun()
+            st.button("削除", key=f"del_{row['id']}", on_click=delete_my_item, args=(row['id'],))
+
+    # 現在値と半値押しまでの距離だけを自動更新し、到達・接近を知らせる
+    with st.expander("⏱ 現在値・半値押しアラート（自動更新）", expanded=True):
+        live_price_panel(
+            my_df.assign(
+                code=my_df["code"].astype(str).str.zfill(4),
+                label=my_df["name"].astype(str) + "（" + my_df["code"].astype(str) + "）",
+            ),
+            "my",
+        )
 
 st.markdown("---")
 # ==============================================================
@@ -299,10 +482,52 @@ st.markdown("""
 
 st.markdown("### 📌 RシステムPRO 監視リスト（本日＋2日前＋3日前）")
 
-df_sys = load_rsystem_watchlist()
+with section("watch_list.load_rsystem"):
+    df_sys = load_rsystem_watchlist()
+
+view_mode = st.radio("表示形式", ["表", "カード"], horizontal=True, key="rsystem_view_mode")
 
 if df_sys.empty:
     st.info("本日・2日前・3日前の抽出結果がありません。")
+elif view_mode == "表":
+    table = build_rsystem_table(df_sys)
+
+    event = st.dataframe(
+        table[list(RSYSTEM_TABLE_COLUMNS)].rename(columns=RSYSTEM_TABLE_COLUMNS),
+        hide_index=True,
+        width="stretch",
+        on_select="rerun",
+        selection_mode="multi-row",
+        key="rsystem_table",
+        column_config={
+            "半値押し株価": st.column_config.NumberColumn(format="%.2f"),
+            "現在値": st.column_config.NumberColumn(format="%.1f"),
+            "対半値押し比(%)": st.column_config.NumberColumn(format="%.2f"),
+            "チャート": st.column_config.LinkColumn(display_text="チャート"),
+            "決算": st.column_config.LinkColumn(display_text="決算"),
+            "ニュース": st.column_config.LinkColumn(display_text="ニュース"),
+        },
+    )
+
+    with st.expander("⏱ 現在値（自動更新）"):
+        live_price_panel(table.assign(label="[" + table["day_label"] + "] " + table["label"]), "rsystem")
+
+    selected = table.iloc[event.selection.rows]
+    if st.button(
+        f"選択した {len(selected)} 銘柄をマイ監視リストに追加",
+        disabled=selected.empty,
+        help="表の左端のチェックで銘柄を選択してください",
+    ):
+        for rec in selected.astype(object).where(selected.notna(), None).to_dict("records"):
+            add_to_watch_list(
+                code=rec["code"],
+                name=rec["name"],
+                half_retrace=rec["half_retrace"],
+                current_price=rec["current_price"],
+                distance_percent=rec["distance"],
+            )
+        st.rerun()
+
 else:
 
     # 見出し行
@@ -315,24 +540,6 @@ else:
     st.markdown("<hr>", unsafe_allow_html=True)
 
     # 銘柄ごとに表示
-    for idx, row in df_sys.iterrows():
-        code = row.get("code", "")
-        name = row.get("name", "")
-        day_label = row.get("day_label", "")
-
-        high = row.get("high")
-        low = row.get("low")
-
-        half_retrace = (high + low) / 2 if high and low else None
-        current_price = row.get("current_price")
-        distance = row.get("halfPriceDistancePercent")
-
-        # 株探リンク
-        chart_url = f"https://kabutan.jp/stock/chart?code={code}"
-        fin_url   = f"https://kabutan.jp/stock/finance?code={code}"
-        news_url  = f"https://kabutan.jp/stock/news?code={code}"
-
-        # 🔽 枠で囲む
     for idx, row in df_sys.iterrows():
         code = row.get("code", "")
         name = row.get("name", "")
@@ -381,3 +588,4 @@ else:
 
             st.markdown("</div>", unsafe_allow_html=True)
 
+page_end(page_timer)
@@ -0,0 +1,217 @@
+"""
+軽量な性能計測（プロセス全体で共有）
+
+    with timed("api", "/api/highlow/today"):      # 外部API・Supabase の呼び出し
+        ...
+    @cache_data(ttl=1800)                          # st.cache_data ＋ ヒット/ミス集計
+    @cache_resource(max_entries=32)                # st.cache_resource ＋ ヒット/ミス集計
+    def load_xxx(...): ...
+    with section("rule1.cards"):                   # 画面の描画区間
+        ...
+    go = lazy_import("plotly.graph_objects")       # 重いモジュールを初めて使うときに import
+
+
+集計は管理ページ（pages/admin_perf.py）で見られる。
+PERF_LOG=1 のときは計測ごとに JSON 1行をログに出す。
+"""
+import functools
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+logger = logging.getLogger("perf")
+
+WINDOW = 2000   # 種類×名前ごとに保持する直近の計測数
+LOG_EVENTS = os.getenv("PERF_LOG", "0") == "1"
+
+_lock = threading.Lock()
+_samples: dict = defaultdict(lambda: deque(maxlen=WINDOW))    # (kind, name) -> [(時刻, 秒, 成否)]
+_cache_calls: dict = defaultdict(lambda: [0, 0])              # name -> [呼び出し数, ミス数]
+_session_runs: dict = defaultdict(lambda: deque(maxlen=200))  # session_id -> [(時刻, ページ, 秒)]
+
+
+def _session_id() -> str | None:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else None
+    except Exception:
+        return None
+
+
+def record(kind: str, name: str, seconds: float, ok: bool = True):
+    with _lock:
+        _samples[(kind, name)].append((time.time(), seconds, ok))
+    if LOG_EVENTS:
+        logger.info(json.dumps({"kind": kind, "name": name, "sec": round(seconds, 4), "ok": ok}, ensure_ascii=False))
+
+
+@contextmanager
+def timed(kind: str, name: str):
+    """with ブロックの所要時間を記録する（例外が出たら失敗として記録）"""
+    t0 = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        record(kind, name, time.perf_counter() - t0, ok)
+
+
+def section(name: str):
+    """画面の描画区間を計測する"""
+    return timed("section", name)
+
+
+def lazy_import(name: str):
+    """
+    初めて使うときに import し、かかった時間を "import" として記録する。
+    起動時に読み込まなくてよい重いモジュール（plotly・supabase など）に使う。
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with timed("import", name):
+        return importlib.import_module(name)
+
+
+# -------------------------------------------------------------
+# st.cache_data のヒット/ミス集計
+# -------------------------------------------------------------
+def _counted_cache(st_cache, cache_kwargs: dict):
+    """st_cache（st.cache_data / st.cache_resource）に、呼び出し時間とヒット/ミス数の記録を足す"""
+    def decorator(func):
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def on_miss(*args, **kwargs):
+            with _lock:
+                _cache_calls[name][1] += 1
+            with timed("cache_miss", name):
+                return func(*args, **kwargs)
+
+        cached = st_cache(**cache_kwargs)(on_miss)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _lock:
+                _cache_calls[name][0] += 1
+            with timed("cache", name):
+                return cached(*args, **kwargs)
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    return decorator
+
+
+def cache_data(**cache_kwargs):
+    """
+    st.cache_data と同じ使い方で、呼び出し時間とヒット/ミス数を記録する。
+    関数本体が実行された回数をミスとして数える。
+    """
+    return _counted_cache(st.cache_data, cache_kwargs)
+
+
+def cache_resource(**cache_kwargs):
+    """st.cache_resource 版の cache_data（戻り値を複製せずに共有するもの）"""
+    return _counted_cache(st.cache_resource, cache_kwargs)
+
+
+def cache_event(name: str, miss: bool):
+    """独自のキャッシュ（st.cache_resource 上の置き場など）のヒット/ミスを数える"""
+    with _lock:
+        _cache_calls[name][0] += 1
+        _cache_calls[name][1] += int(miss)
+
+
+# -------------------------------------------------------------
+# セッションごとの1回の実行（rerun）コスト
+# -------------------------------------------------------------
+def page_start(page: str) -> tuple:
+    return page, time.perf_counter()
+
+
+def page_end(token: tuple):
+    page, t0 = token
+    seconds = time.perf_counter() - t0
+    record("page", page, seconds)
+    sid = _session_id()
+    if sid:
+        with _lock:
+            _session_runs[sid].append((time.time(), page, seconds))
+
+
+# -------------------------------------------------------------
+# 集計
+# -------------------------------------------------------------
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+
+def snapshot(since: float | None = None) -> dict:
+    """計測値の集計を dict で返す（JSON にそのまま出せる形）"""
+    with _lock:
+        samples = {k: list(v) for k, v in _samples.items()}
+        cache_calls = {k: list(v) for k, v in _cache_calls.items()}
+        session_runs = {k: list(v) for k, v in _session_runs.items()}
+
+    timings = []
+    for (kind, name), rows in samples.items():
+        if since is not None:
+            rows = [r for r in rows if r[0] >= since]
+        if not rows:
+            continue
+        secs = sorted(r[1] for r in rows)
+        timings.append({
+            "kind": kind,
+            "name": name,
+            "count": len(secs),
+            "errors": sum(1 for r in rows if not r[2]),
+            "p50": _percentile(secs, 0.50),
+            "p90": _percentile(secs, 0.90),
+            "p99": _percentile(secs, 0.99),
+            "max": secs[-1],
+            "total": sum(secs),
+        })
+
+    caches = [
+        {"name": name, "calls": calls, "misses": misses,
+         "hit_ratio": (calls - misses) / calls if calls else None}
+        for name, (calls, misses) in cache_calls.items()
+    ]
+
+    sessions = []
+    for sid, runs in session_runs.items():
+        secs = [r[2] for r in runs]
+        sessions.append({
+            "session": sid[:8],
+            "runs": len(runs),
+            "mean": sum(secs) / len(secs),
+            "last": secs[-1],
+            "last_page": runs[-1][1],
+            "last_at": runs[-1][0],
+        })
+
+    return {"generated_at": time.time(), "timings": timings, "caches": caches, "sessions": sessions}
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _cache_calls.clear()
+        _session_runs.clear()
@@ -0,0 +1,226 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from requests.exceptions import ReadTimeout, RequestException
+
+from perf import cache_data
+from tower_api import (
+    get_frame,
+    get_json,
+    get_json_revalidated,
+    records_frame,
+    revalidated_payload,
+)
+
+# 抽出結果（/api/highlow/<day>）の種類
+HIGHLOW_SOURCES = ["today", "yesterday", "target2day", "target3day", "target4day", "target5day"]
+HIGHLOW_LABELS = {
+    "today": "本日",
+    "yesterday": "昨日",
+    "target2day": "2日前",
+    "target3day": "3日前",
+    "target4day": "4日前",
+    "target5day": "5日前",
+}
+
+# キャッシュの区切り（秒）。同じ区切りの間は同じデータを返す
+HIGHLOW_PERIOD = 1800    # 抽出結果：約30分ごとに更新
+HIGHLOW_CHECK = 60       # 抽出結果が更新されたかをサーバーに確かめる間隔
+BATCH_PERIOD = 900       # 現在値つき batch
+BREAKOUT_PERIOD = 300    # 5ヶ月もみ合いブレイク
+LIVE_PERIOD = 30         # 現在値の自動更新パネル用に batch を取り直す間隔
+LIVE_IDLE = 300          # パネルが最後に読まれてからこの秒数たったら取り直しをやめる
+
+BATCH_COLUMNS = ["current_price", "halfPriceDistancePercent"]
+
+
+def time_bucket(period: int, now: float | None = None) -> int:
+    """
+    現在時刻を period 秒ごとに区切った番号。
+    キャッシュのキーに含めることで、次の区切りの分を前もって用意できる。
+    """
+    return int((time.time() if now is None else now) // period)
+
+
+# -------------------------------------------------------------
+# 抽出結果（本日〜5日前）
+# -------------------------------------------------------------
+def _highlow_path(source: str) -> str:
+    if source not in HIGHLOW_SOURCES:
+        source = "today"
+    return f"/api/highlow/{source}"
+
+
+# キャッシュウォーマーが最後に確かめたバージョン（source -> (version, 確かめた時刻)）
+_seen_lock = threading.Lock()
+_seen_versions: dict = {}
+
+
+def probe_highlow_version(source: str) -> str:
+    """
+    抽出結果のバージョン（ETag など。無ければ本文のハッシュ）をサーバーに確かめて覚えておく。
+    ETag などがあれば条件付き GET なので、変わっていなければ 304 が返るだけで本文は落とさない。
+    """
+    _, version = get_json_revalidated(_highlow_path(source), read_timeout=15)
+    with _seen_lock:
+        _seen_versions[source] = (version, time.time())
+    return version
+
+
+@cache_data(ttl=HIGHLOW_CHECK * 2, max_entries=60, show_spinner=False)
+def highlow_version(source: str, bucket: int) -> str:
+    """ウォーマーが動いていないときの確認（HIGHLOW_CHECK の区切りごとに全セッションで1回）"""
+    return probe_highlow_version(source)
+
+
+def current_highlow_version(source: str) -> str:
+    """
+    キャッシュウォーマーが HIGHLOW_CHECK ごとに確かめたバージョンを読むだけにする（待たない）。
+    ウォーマーがしばらく確かめていなければ、区切りごとに1回その場で確かめる。
+    """
+    with _seen_lock:
+        seen = _seen_versions.get(source)
+    if seen is not None and time.time() - seen[1] < HIGHLOW_CHECK * 3:
+        return seen[0]
+    return highlow_version(source, time_bucket(HIGHLOW_CHECK))
+
+
+def probe_all_highlow_versions():
+    """本日〜5日前のバージョンを並列に確かめる（キャッシュウォーマー用）"""
+    with ThreadPoolExecutor(max_workers=len(HIGHLOW_SOURCES)) as executor:
+        list(executor.map(probe_highlow_version, HIGHLOW_SOURCES))
+
+
+@cache_data(ttl=HIGHLOW_PERIOD * 2, max_entries=60, show_spinner=False)
+def load_highlow(source: str, version: str) -> pd.DataFrame:
+    """version が変わったときだけ DataFrame を作り直す（全セッションで共有）"""
+    # バージョン確認のときに取得した本文があればそれを使う（同じデータを2回落とさない）
+    data = revalidated_payload(_highlow_path(source), version)
+    if data is None:
+        data, _ = get_json_revalidated(_highlow_path(source), read_timeout=15)
+    df = records_frame(data)
+
+    # データの型を明示的に変換（high, lowなどが数値であることを保証）
+    if not df.empty:
+        for col in ["high", "low"]:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+        df.dropna(subset=[c for c in ["high", "low"] if c in df.columns], inplace=True)
+    return df
+
+
+def current_highlow(source: str) -> pd.DataFrame:
+    """サーバー側のデータが更新されていれば最新を、そうでなければキャッシュを返す"""
+    return load_highlow(source, current_highlow_version(source))
+
+
+# -------------------------------------------------------------
+# 本日〜5日前をまとめた一覧（銘柄ごとに1行）
+# -------------------------------------------------------------
+def merge_highlow(frames: dict) -> pd.DataFrame:
+    """
+    {source: DataFrame} を code ごとに1行へまとめる。
+    一番新しい高値日の行を残し、載っていた日（出現日）とその数を付ける。
+    """
+    parts = [
+        df.assign(_day=HIGHLOW_SOURCES.index(source))
+        for source, df in frames.items()
+        if not df.empty and "code" in df.columns
+    ]
+    if not parts:
+        return pd.DataFrame()
+
+    rows = pd.concat(parts, ignore_index=True)
+    rows["code"] = rows["code"].astype(str)
+    rows = rows.sort_values("_day", kind="stable")
+
+    labels = rows["_day"].map(dict(enumerate(HIGHLOW_LABELS[s] for s in HIGHLOW_SOURCES)))
+    days = labels.groupby(rows["code"], sort=False).agg(["・".join, "size"])
+    days.columns = ["出現日", "出現回数"]
+
+    latest = rows.drop_duplicates("code", keep="first").set_index("code")
+    return latest.join(days).drop(columns="_day").reset_index()
+
+
+@cache_data(ttl=HIGHLOW_PERIOD * 2, max_entries=20, show_spinner=False)
+def load_all_highlow(versions: tuple) -> pd.DataFrame:
+    """versions は ((source, version), ...)。どれかの日が更新されたときだけ作り直す"""
+    with ThreadPoolExecutor(max_workers=len(versions)) as executor:
+        frames = executor.map(lambda sv: load_highlow(*sv), versions)
+        return merge_highlow(dict(zip((s for s, _ in versions), frames)))
+
+
+def current_all_highlow() -> pd.DataFrame:
+    """本日〜5日前を並列に確認・取得し、重複をまとめた一覧を返す"""
+    with ThreadPoolExecutor(max_workers=len(HIGHLOW_SOURCES)) as executor:
+        versions = tuple(zip(HIGHLOW_SOURCES, executor.map(current_highlow_version, HIGHLOW_SOURCES)))
+    return load_all_highlow(versions)
+
+
+# -------------------------------------------------------------
+# 現在値つき batch
+# -------------------------------------------------------------
+def fetch_batch_current() -> tuple[pd.DataFrame, str | None]:
+    """
+    現在値付きの batch を取得し、code（ゼロ埋め4桁）をインデックスにして返す。
+    別スレッドから呼ぶので、画面表示はせずにエラーメッセージを返す。
+    """
+    try:
+        # ★ 読み込みタイムアウトを伸ばす（30〜40秒くらい）
+        df = get_frame("/api/highlow/batch", read_timeout=40)
+    except ReadTimeout:
+        return pd.DataFrame(), "現在値の取得がタイムアウトしました。半値押しは表示されますが、現在値・距離は空欄になります。"
+    except RequestException as e:
+        return pd.DataFrame(), f"現在値の取得に失敗しました: {e}"
+
+    if df.empty or "code" not in df.columns:
+        return pd.DataFrame(), None
+
+    # 必要な列だけ残す
+    df["code"] = df["code"].astype(str).str.zfill(4)
+    df = df[["code"] + [c for c in BATCH_COLUMNS if c in df.columns]]
+    return df.drop_duplicates("code", keep="last").set_index("code"), None
+
+
+@cache_data(ttl=BATCH_PERIOD * 2, show_spinner=False)
+def load_batch(bucket: int) -> tuple[pd.DataFrame, str | None]:
+    return fetch_batch_current()
+
+
+# -------------------------------------------------------------
+# 現在値の自動更新（キャッシュウォーマーが取り直し、画面は最後に取れたものを読むだけ）
+# -------------------------------------------------------------
+_live_lock = threading.Lock()
+_live = {"df": None, "err": None, "at": None, "read": 0.0}
+
+
+def refresh_live_prices():
+    """自動更新パネルが直近 LIVE_IDLE 秒以内に読まれていれば、batch を取り直して置いておく"""
+    with _live_lock:
+        if time.time() - _live["read"] > LIVE_IDLE:
+            return
+    df, err = fetch_batch_current()
+    with _live_lock:
+        if err is None:
+            _live.update(df=df, at=time.time())
+        _live["err"] = err   # 失敗したときは前回の現在値を残す
+
+
+def live_prices() -> tuple[pd.DataFrame | None, str | None, float | None]:
+    """最後に取り直した (現在値, エラー, 取得時刻)。まだ取れていなければ現在値は None"""
+    with _live_lock:
+        _live["read"] = time.time()
+        return _live["df"], _live["err"], _live["at"]
+
+
+# -------------------------------------------------------------
+# 5ヶ月もみ合いブレイク銘柄一覧
+# -------------------------------------------------------------
+@cache_data(ttl=BREAKOUT_PERIOD * 2, show_spinner=False)
+def load_breakouts(bucket: int) -> list:
+    data = get_json("/api/pattern/5m_breakout", read_timeout=60)
+    if not data:
+        return []
+    return data
@@ -0,0 +1,134 @@
+"""
+抽出結果（/api/highlow/<day> と同じ列）の絞り込み・検索・並べ替え
+
+キャッシュ済みの DataFrame から、判定に使う列と並び順を一度だけ作っておき、
+画面の操作ごとにはマスクの掛け合わせと並び順の切り出しだけで答える。
+"""
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from etf_list import etf_codes
+from perf import cache_resource
+
+# 並べ替えに使える列（画面の表示名 -> 列名）
+SORT_KEYS = {
+    "倍率": "倍率",
+    "上昇幅": "rise",
+    "高値からの距離": "from_high_pct",
+    "銘柄コード": "code",
+    "高値日": "high_date",
+    "出現回数": "出現回数",
+}
+
+
+def _normalize(values: pd.Series) -> pd.Series:
+    """全角・半角と大文字・小文字の違いをなくす（前方一致の検索用）"""
+    return values.fillna("").astype(str).map(lambda s: unicodedata.normalize("NFKC", s).lower())
+
+
+def is_etf(codes: pd.Series, etf: frozenset) -> np.ndarray:
+    return codes.astype(str).str.zfill(4).isin(etf).to_numpy(dtype=bool)
+
+
+class ScreeningIndex:
+    """
+    抽出結果 1 つ分の索引。
+    上昇幅（高値 − 安値）、高値からの距離（現在値があれば）、ETF 判定（JPX の一覧）を列として持ち、
+    列ごとの並び順は最初に使われたときに作って保持する。
+    """
+
+    def __init__(self, df: pd.DataFrame, prices: pd.DataFrame | None = None):
+        df = df.reset_index(drop=True)
+        code = df["code"].astype(str)
+        name = df["name"] if "name" in df.columns else pd.Series("", index=df.index)
+        high = pd.to_numeric(df["high"], errors="coerce").to_numpy(dtype=np.float64)
+        low = pd.to_numeric(df["low"], errors="coerce").to_numpy(dtype=np.float64)
+
+        if prices is not None and "current_price" in prices.columns:
+            current = pd.to_numeric(prices["current_price"], errors="coerce")
+            current = current.reindex(code.str.zfill(4)).to_numpy(dtype=np.float64)
+        else:
+            current = np.full(len(df), np.nan)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df = df.assign(
+                code=code,
+                rise=high - low,
+                rise_pct=np.round((high / low - 1) * 100, 2),
+                current_price=current,
+                from_high_pct=np.round((current / high - 1) * 100, 2),
+            )
+
+        self.df = df
+        self._code = _normalize(code)
+        self._name = _normalize(name)
+        self._mult = pd.to_numeric(df["倍率"], errors="coerce").to_numpy(dtype=np.float64) \
+            if "倍率" in df.columns else np.full(len(df), np.nan)
+        self._etf = (None, None)    # (判定に使った一覧, 判定結果)。一覧が取り直されたら作り直す
+        self._orders: dict = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def mult_bounds(self) -> tuple[float, float]:
+        finite = self._mult[np.isfinite(self._mult)]
+        if not len(finite):
+            return 1.0, 1.0
+        return float(finite.min()), float(finite.max())
+
+    def _etf_mask(self) -> np.ndarray:
+        etf = etf_codes()
+        with self._lock:
+            if self._etf[0] is not etf:
+                self._etf = (etf, is_etf(self.df["code"], etf))
+            return self._etf[1]
+
+    def _order(self, column: str, ascending: bool) -> np.ndarray:
+        """列の並び順（欠損は常に最後）。一度作ったら使い回す"""
+        key = (column, ascending)
+        with self._lock:
+            if key not in self._orders:
+                values = self.df[column]
+                missing = values.isna().to_numpy()
+                rank = values.rank(method="first", ascending=ascending).to_numpy()
+                self._orders[key] = np.lexsort((rank, missing))
+            return self._orders[key]
+
+    def query(self, search: str = "", exclude_codes=(), exclude_etf: bool = False,
+              mult_range: tuple | None = None, sort: str | None = None,
+              ascending: bool = False) -> pd.DataFrame:
+        mask = np.ones(len(self.df), dtype=bool)
+
+        search = unicodedata.normalize("NFKC", search).strip().lower()
+        if search:
+            mask &= (self._code.str.startswith(search) | self._name.str.startswith(search)).to_numpy()
+        if exclude_codes:
+            mask &= ~self.df["code"].isin(exclude_codes).to_numpy()
+        if exclude_etf:
+            mask &= ~self._etf_mask()
+        if mult_range is not None:
+            lo, hi = mult_range
+            mask &= (self._mult >= lo) & (self._mult <= hi)
+
+        column = SORT_KEYS.get(sort, sort)
+        if column in self.df.columns:
+            order = self._order(column, ascending)
+            rows = order[mask[order]]
+        else:
+            rows = np.flatnonzero(mask)   # 標準は API の順番のまま
+        return self.df.iloc[rows]
+
+
+@cache_resource(max_entries=32, show_spinner=False)
+def get_screening_index(key, _df: pd.DataFrame, _prices: pd.DataFrame | None = None) -> ScreeningIndex:
+    """key（データの指紋・現在値の区切り）ごとにプロセスで1つだけ作る"""
+    return ScreeningIndex(_df, _prices)
+
+
+def frame_key(df: pd.DataFrame) -> int:
+    """DataFrame の中身から索引のキーを作る（キャッシュから返るたびに別オブジェクトになるため）"""
+    return int(pd.util.hash_pandas_object(df, index=False).to_numpy().sum(dtype=np.uint64))
@@ -0,0 +1,342 @@
+"""
+Tower API のローカル代替サーバー（性能測定・障害再現用）
+
+    python tools/mock_tower_api.py --port 8765 --codes 500 --latency 0.2
+    TOWER_API_BASE=http://127.0.0.1:8765 streamlit run app_rise_TEST.py
+
+本番APIから fixtures を録っておく場合:
+
+    python tools/mock_tower_api.py record --out fixtures/ --candles 50
+
+--fixtures を指定すると、録ったファイルがある分はそれを返し、無い分は合成データを返す。
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+HIGHLOW_SOURCES = ["today", "yesterday", "target2day", "target3day", "target4day", "target5day"]
+ENDPOINTS = ("highlow", "batch", "candle", "breakout")
+PRODUCTION_BASE = "https://app.kumagai-stock.com"
+
+
+# -------------------------------------------------------------
+# 合成データ（銘柄コードごとに決まった乱数で作るので毎回同じ内容）
+# -------------------------------------------------------------
+class SyntheticData:
+    def __init__(self, codes: int = 100, bars: int = 250, seed: int = 0, end: date | None = None):
+        self.codes = [str(1300 + i * 7 % 8700).zfill(4) for i in range(codes)]
+        self.bars = bars
+        self.seed = seed
+        self.end = end or date.today()
+
+    def _rng(self, *key) -> random.Random:
+        return random.Random(f"{self.seed}:{':'.join(map(str, key))}")
+
+    def _trading_days(self, n: int) -> list[date]:
+        days, d = [], self.end - timedelta(days=1)
+        while len(days) < n:
+            if d.weekday() < 5:
+                days.append(d)
+            d -= timedelta(days=1)
+        return days[::-1]
+
+    def candle(self, code: str) -> dict:
+        rng = self._rng("candle", code)
+        price = rng.uniform(200, 5000)
+        rows = []
+        for d in self._trading_days(self.bars):
+            o = price
+            c = max(o * (1 + rng.gauss(0, 0.025)), 1)
+            h = max(o, c) * (1 + abs(rng.gauss(0, 0.01)))
+            l = min(o, c) * (1 - abs(rng.gauss(0, 0.01)))
+            rows.append({
+                "date": d.strftime("%Y%m%d"),
+                "open": round(o, 1), "high": round(h, 1), "low": round(l, 1), "close": round(c, 1),
+            })
+            price = c
+        return {"code": code, "data": rows}
+
+    def highlow(self, source: str) -> list[dict]:
+        offset = HIGHLOW_SOURCES.index(source) if source in HIGHLOW_SOURCES else 0
+        rng = self._rng("highlow", source)
+        high_day = self._trading_days(offset + 1)[0]
+        picked = [c for c in self.codes if rng.random() < 0.3]
+        rows = []
+        for code in picked:
+            low = round(rng.uniform(200, 5000), 1)
+            ratio = rng.uniform(1.3, 2.0)
+            rows.append({
+                "code": code,
+                "name": f"テスト銘柄{code}",
+                "high": round(low * ratio, 1),
+                "high_date": high_day.strftime("%Y-%m-%d"),
+                "low": low,
+                "low_date": (high_day - timedelta(days=rng.randint(3, 13))).strftime("%Y-%m-%d"),
+                "倍率": round(ratio, 2),
+            })
+        return rows
+
+    def batch(self) -> list[dict]:
+        rng = self._rng("batch", int(time.time() // 60))
+        return [
+            {
+                "code": code,
+                "current_price": round(rng.uniform(200, 5000), 1),
+                "halfPriceDistancePercent": round(rng.uniform(-30, 30), 2),
+            }
+            for code in self.codes
+        ]
+
+    def breakouts(self) -> list[dict]:
+        rng = self._rng("breakouts")
+        rows = []
+        for code in self.codes:
+            if rng.random() >= 0.1:
+                continue
+            base_low = round(rng.uniform(200, 5000), 1)
+            base_high = round(base_low * rng.uniform(1.1, 1.4), 1)
+            rows.append({
+                "code": code,
+                "name": f"テスト銘柄{code}",
+                "base_high": base_high,
+                "base_low": base_low,
+                "break_date": self._trading_days(1)[0].strftime("%Y%m%d"),
+                "break_close": round(base_high * rng.uniform(1.0, 1.08), 1),
+            })
+        return rows
+
+
+# -------------------------------------------------------------
+# サーバー本体
+# -------------------------------------------------------------
+class MockTowerAPI:
+    """
+    別スレッドで動くモックサーバー。
+    latency は秒（{"candle": 0.3} のようにエンドポイントごとにも指定可）、
+    error_rate は 500 を返す確率。
+    """
+
+    def __init__(self, data: SyntheticData | None = None, fixtures: str | None = None,
+                 latency: float | dict = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.data = data or SyntheticData()
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0, "by_endpoint": {}}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockTowerAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-tower-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": 0, "errors": 0, "bytes": 0, "by_endpoint": {}}
+
+    def _fixture(self, name: str, synthesize):
+        """録った fixture があればそれを、無ければ合成データを返す"""
+        path = os.path.join(self.fixtures, f"{name}.json") if self.fixtures else None
+        if path is None or not os.path.exists(path):
+            return synthesize()
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _resolve(self, path: str, query: dict):
+        """(エンドポイント名, レスポンス) を返す。該当なしは (None, None)"""
+        if path.startswith("/api/highlow/"):
+            source = path.rsplit("/", 1)[-1]
+            if source == "batch":
+                return "batch", self._fixture("highlow_batch", self.data.batch)
+            if source in HIGHLOW_SOURCES:
+                return "highlow", self._fixture(f"highlow_{source}", lambda: self.data.highlow(source))
+        elif path == "/api/candle":
+            code = query.get("code", [""])[0]
+            return "candle", self._fixture(f"candle_{code}", lambda: self.data.candle(code))
+        elif path == "/api/pattern/5m_breakout":
+            return "breakout", self._fixture("5m_breakout", self.data.breakouts)
+        return None, None
+
+    def _delay(self, endpoint: str, rng: random.Random) -> float:
+        base = self.latency.get(endpoint, 0.0) if isinstance(self.latency, dict) else self.latency
+        return max(base + rng.uniform(-self.jitter, self.jitter), 0.0)
+
+    def _record(self, endpoint: str, size: int, error: bool):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["errors"] += int(error)
+            self.stats["bytes"] += size
+            self.stats["by_endpoint"][endpoint] = self.stats["by_endpoint"].get(endpoint, 0) + 1
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive を有効にする
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+
+                # 計測用：集計値の取得・リセット（集計には含めない）
+                if url.path == "/__stats":
+                    with api._lock:
+                        body = json.dumps(api.stats).encode("utf-8")
+                    self._send(200, body, None)
+                    return
+                if url.path == "/__reset":
+                    api.reset_stats()
+                    self._send(200, b"{}", None)
+                    return
+
+                endpoint, payload = api._resolve(url.path, parse_qs(url.query))
+                rng = random.Random()
+
+                if endpoint is None:
+                    self._send(404, b'{"error": "not found"}', "unknown")
+                    return
+
+                time.sleep(api._delay(endpoint, rng))
+                if rng.random() < api.error_rate:
+                    self._send(500, b'{"error": "injected"}', endpoint)
+                    return
+
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                # 条件付き GET：本文が同じなら 304 だけ返す
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", endpoint, {"ETag": etag})
+                    return
+                self._send(200, body, endpoint, {"ETag": etag})
+
+            def _send(self, status: int, body: bytes, endpoint: str | None, headers: dict | None = None):
+                if body and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=5)
+                    encoding = "gzip"
+                else:
+                    encoding = None
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                if endpoint is not None:
+                    api._record(endpoint, len(body), status >= 500)
+
+        return Handler
+
+
+# -------------------------------------------------------------
+# 本番APIから fixtures を録る
+# -------------------------------------------------------------
+def record_fixtures(out: str, base: str = PRODUCTION_BASE, candles: int = 50):
+    os.makedirs(out, exist_ok=True)
+
+    def fetch(path: str):
+        with urlopen(f"{base}{path}", timeout=60) as resp:
+            return json.load(resp)
+
+    def save(name: str, payload):
+        with open(os.path.join(out, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+
+    codes = []
+    for source in HIGHLOW_SOURCES:
+        rows = fetch(f"/api/highlow/{source}")
+        save(f"highlow_{source}", rows)
+        codes.extend(str(r.get("code")) for r in rows)
+    save("highlow_batch", fetch("/api/highlow/batch"))
+    save("5m_breakout", fetch("/api/pattern/5m_breakout"))
+    for code in list(dict.fromkeys(codes))[:candles]:
+        save(f"candle_{code}", fetch(f"/api/candle?code={code}"))
+
+
+def _parse_latency(values: list[str]) -> float | dict:
+    """'0.2'（全体）や 'candle=0.5'（エンドポイント別）の指定をまとめる"""
+    default, per_endpoint = 0.0, {}
+    for v in values:
+        if "=" in v:
+            k, sec = v.split("=", 1)
+            per_endpoint[k] = float(sec)
+        else:
+            default = float(v)
+    if not per_endpoint:
+        return default
+    return {k: per_endpoint.get(k, default) for k in ENDPOINTS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command")
+
+    rec = sub.add_parser("record", help="本番APIから fixtures を保存する")
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--base", default=PRODUCTION_BASE)
+    rec.add_argument("--candles", type=int, default=50, help="保存する日足の銘柄数")
+
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="録った JSON のディレクトリ")
+    parser.add_argument("--codes", type=int, default=100, help="合成データの銘柄数")
+    parser.add_argument("--bars", type=int, default=250, help="1銘柄あたりの日足の本数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", action="append", default=[],
+                        help="応答遅延（秒）。'candle=0.5' のようにエンドポイント別にも指定可")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延のゆらぎ（±秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 を返す確率（0〜1）")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_fixtures(args.out, base=args.base, candles=args.candles)
+        return
+
+    api = MockTowerAPI(
+        data=SyntheticData(codes=args.codes, bars=args.bars, seed=args.seed),
+        fixtures=args.fixtures,
+        latency=_parse_latency(args.latency),
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"mock Tower API: {api.base_url}  (TOWER_API_BASE={api.base_url})")
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+起動時間のプロファイル（各ページが import するモジュールごとの時間）
+
+ページのファイルから import 文を読み取り、`python -X importtime` で別プロセスに import させて、
+トップレベルのパッケージごとの所要時間を集計する。
+遅延読み込みしているモジュール（plotly・supabase）は、使われたときにかかる分として別に出す。
+
+    python tools/startup_profile.py
+    python tools/startup_profile.py --pages rule2 --top 10 --json startup.json
+
+アプリ内で実際にかかった遅延 import・初期化の時間は、管理ページ（pages/admin_perf.py）で見られる。
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {
+    "rule1": "app_rise_TEST.py",
+    "watch_list": os.path.join("pages", "watch_list.py"),
+    "rule2": os.path.join("pages", "rule2.py"),
+}
+LAZY_MODULES = ["plotly.graph_objects", "supabase"]
+
+
+def page_imports(path: str) -> list[str]:
+    """ページのファイルの先頭レベルの import 文（TYPE_CHECKING の中は除く）"""
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def importtime(modules: list[str], preload: list[str] | None = None) -> list[tuple[str, int, int]]:
+    """
+    modules を import したときの (モジュール名, self[us], cumulative[us]) の一覧。
+    preload は計測前に読み込んでおく（その分は数えない）。
+    """
+    code = "".join(f"import {m}\n" for m in preload or [])
+    code += "import sys; sys.stderr.write('--start--\\n')\n"
+    code += "".join(f"import {m}\n" for m in modules)
+    env = dict(os.environ, CACHE_WARMER="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    rows = []
+    started = False
+    for line in proc.stderr.splitlines():
+        if line == "--start--":
+            started = True
+            continue
+        if not started or not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize(rows: list[tuple[str, int, int]], top: int) -> dict:
+    """トップレベルのパッケージごとに self の時間を合計する"""
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    packages = sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)
+    return {
+        "total_ms": sum(self_us for _, self_us, _ in rows) / 1000,
+        "modules": len(rows),
+        "packages": [{"package": p, "ms": us / 1000} for p, us in packages[:top]],
+    }
+
+
+def print_summary(title: str, summary: dict):
+    print(f"\n== {title}: {summary['total_ms']:.0f} ms（{summary['modules']} モジュール）")
+    for row in summary["packages"]:
+        print(f"  {row['package']:<28} {row['ms']:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES))
+    parser.add_argument("--top", type=int, default=15, help="表示するパッケージ数")
+    parser.add_argument("--json", help="結果を JSON で保存するパス")
+    args = parser.parse_args()
+
+    report = {"pages": {}, "lazy": {}}
+
+    # streamlit 本体はサーバー起動時に読み込まれるので、ページの分からは除く
+    for page in args.pages:
+        modules = page_imports(PAGES[page])
+        summary = summarize(importtime(modules, preload=["streamlit"]), args.top)
+        report["pages"][page] = summary
+        print_summary(f"{page}（{PAGES[page]}）", summary)
+
+    # 遅延読み込みのモジュールは、ページの import を済ませたあとの追加分を測る
+    base = [m for page in args.pages for m in page_imports(PAGES[page])]
+    for module in LAZY_MODULES:
+        try:
+            summary = summarize(importtime([module], preload=["streamlit", *dict.fromkeys(base)]), args.top)
+        except RuntimeError as e:
+            print(f"\n== {module}: 読み込めません（{e}）")
+            continue
+        report["lazy"][module] = summary
+        print_summary(f"遅延読み込み {module}", summary)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
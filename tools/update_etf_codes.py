@@ -0,0 +1,28 @@
+"""
+ETF・ETN の銘柄コード一覧を JPX から取り直す
+
+    python tools/update_etf_codes.py
+    python tools/update_etf_codes.py --out data/etf_codes.txt
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from etf_list import ETF_CODES_PATH, JPX_LIST_URL, refresh_etf_codes  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=ETF_CODES_PATH, help="保存先")
+    parser.add_argument("--url", default=JPX_LIST_URL, help="東証上場銘柄一覧（.xls）の URL")
+    args = parser.parse_args()
+
+    n = refresh_etf_codes(args.out, args.url)
+    print(f"{n} 銘柄を {args.out} に保存しました。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from perf import timed
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson が無い環境では標準の json で代用
+    import json
+
+    _loads = json.loads
+
+# Tower API のベースURL
+API_BASE = os.getenv("TOWER_API_BASE", "https://app.kumagai-stock.com")
+
+CONNECT_TIMEOUT = 3         # 接続タイムアウト（全エンドポイント共通）
+DEFAULT_READ_TIMEOUT = 15   # 読み取りタイムアウトの既定値
+POOL_MAXSIZE = 16           # 1ホストあたりの keep-alive 接続数
+
+_session = None
+_session_lock = threading.Lock()
+
+# 条件付き GET 用：URL -> (ETag, Last-Modified, バージョン, デコード済みデータ)
+_validated: dict = {}
+_validated_lock = threading.Lock()
+
+
+# -------------------------------------------------------------
+# keep-alive 付きの共有セッション（プロセス内で1つだけ作る）
+# -------------------------------------------------------------
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                # 再試行は接続失敗と 502/503/504 だけ。読み取りタイムアウトは再試行しない
+                # （read=False なら requests の ReadTimeout がそのまま上がる）
+                retry = Retry(
+                    total=2,
+                    read=False,
+                    backoff_factor=0.3,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=("GET",),
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update({
+                    "Accept": "application/json",
+                    "Accept-Encoding": "gzip, deflate",
+                })
+                _session = s
+    return _session
+
+
+def get_json(path: str, params: dict | None = None, read_timeout: float = DEFAULT_READ_TIMEOUT):
+    """API_BASE + path を GET して JSON をデコードして返す"""
+    with timed("api", path):
+        resp = get_session().get(
+            f"{API_BASE}{path}",
+            params=params,
+            timeout=(CONNECT_TIMEOUT, read_timeout),
+        )
+        resp.raise_for_status()
+        try:
+            return _loads(resp.content)
+        except ValueError as e:
+            # resp.json() と同じく RequestException 系の例外にそろえる
+            raise requests.exceptions.InvalidJSONError(str(e), response=resp) from e
+
+
+def get_json_revalidated(path: str, params: dict | None = None,
+                         read_timeout: float = DEFAULT_READ_TIMEOUT) -> tuple:
+    """
+    前回の ETag / Last-Modified を付けて条件付き GET し、(データ, バージョン) を返す。
+    304（変更なし）のときは前回デコードしたデータをそのまま返す。
+    バージョンは ETag → Last-Modified → 本文のハッシュの順で決める。
+    """
+    url = _full_url(path, params)
+    with _validated_lock:
+        cached = _validated.get(url)
+
+    headers = {}
+    if cached:
+        etag, last_modified, _, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    with timed("api", path):
+        resp = get_session().get(url, headers=headers, timeout=(CONNECT_TIMEOUT, read_timeout))
+        if resp.status_code == 304 and cached:
+            return cached[3], cached[2]
+        resp.raise_for_status()
+        try:
+            data = _loads(resp.content)
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(str(e), response=resp) from e
+
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    version = etag or last_modified or hashlib.blake2b(resp.content, digest_size=16).hexdigest()
+    with _validated_lock:
+        _validated[url] = (etag, last_modified, version, data)
+    return data, version
+
+
+def _full_url(path: str, params: dict | None = None) -> str:
+    return requests.Request("GET", f"{API_BASE}{path}", params=params).prepare().url
+
+
+def revalidated_payload(path: str, version: str, params: dict | None = None):
+    """get_json_revalidated で取得済みのデータが version のものなら返す（無ければ None）"""
+    with _validated_lock:
+        cached = _validated.get(_full_url(path, params))
+    if cached and cached[2] == version:
+        return cached[3]
+    return None
+
+
+def records_frame(data, key: str | None = None) -> pd.DataFrame:
+    """レコード配列（key 指定時は {key: [...]}）を DataFrame にする"""
+    if key is not None:
+        data = data.get(key) or []
+    if not data:
+        return pd.DataFrame()
+    return pd.DataFrame.from_records(data)
+
+
+def get_frame(path: str, params: dict | None = None, read_timeout: float = DEFAULT_READ_TIMEOUT,
+              key: str | None = None) -> pd.DataFrame:
+    """
+    レコード配列の JSON を DataFrame にして返す。
+    key を指定すると {key: [...]} 形式のレスポンスから取り出す。
+    """
+    return records_frame(get_json(path, params=params, read_timeout=read_timeout), key=key)
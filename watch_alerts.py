@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+STATUS_REACHED = "到達"    # 現在値が半値押し以下
+STATUS_NEAR = "接近"       # 半値押しまで threshold % 以内
+STATUS_NONE = ""
+
+
+def evaluate_alerts(watch_df: pd.DataFrame, prices: pd.DataFrame, threshold_pct: float = 3.0) -> pd.DataFrame:
+    """
+    マイ監視リストの全行と最新の現在値（code をインデックスにした batch）を一度につなぎ、
+    半値押しまでの距離（%）を計算し直して、到達・接近を判定する。
+    """
+    if watch_df.empty:
+        return pd.DataFrame(columns=["code", "name", "half_retrace", "current_price", "distance", "status"])
+
+    code = watch_df["code"].astype(str).str.zfill(4)
+    half_retrace = pd.to_numeric(watch_df["half_retrace"], errors="coerce").to_numpy(dtype=np.float64)
+
+    if "current_price" in prices.columns:
+        current = pd.to_numeric(prices["current_price"], errors="coerce")
+        current_price = current.reindex(code).to_numpy(dtype=np.float64)
+    else:
+        current_price = np.full(len(watch_df), np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        distance = np.round((current_price - half_retrace) / half_retrace * 100, 2)
+
+    reached = current_price <= half_retrace
+    near = ~reached & (distance <= threshold_pct)
+    status = np.select([reached, near], [STATUS_REACHED, STATUS_NEAR], default=STATUS_NONE)
+
+    return pd.DataFrame({
+        "code": code.to_numpy(),
+        "name": watch_df["name"].to_numpy(),
+        "half_retrace": half_retrace,
+        "current_price": current_price,
+        "distance": distance,
+        "status": status,
+    })